@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Time each step of LingoMan separately (without GUI), on a project made by generate.py.
+Coding Example:
+    python benchmarks/generate.py /tmp/synthetic
+    python benchmarks/bench.py --config /tmp/synthetic.json --output before.json
+    python benchmarks/bench.py --config /tmp/synthetic.json --baseline before.json
+Each stage runs --repeat times, and the best and median wall times are reported.
+With --baseline, times are compared with an earlier result file. Stages slower than --tolerance are marked.
+Database, caches and exported files are written to a temporary folder, so the project itself isn't changed.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import Config, TextAnalyzer
+from database import TextDataBase
+
+
+class Benchmark:
+    """
+    Coding Example:
+        bench = Benchmark(repeat=3)
+        bench.run('walk_game_root', analyzer.walk_game_root)
+        print(bench.results)
+    """
+    def __init__(self, repeat=3, quiet=True):
+        """
+        :param repeat: times of each stage.
+        :param quiet: drop console output of stages.
+        """
+        self._repeat = max(repeat, 1)
+        self._quiet = quiet
+        self._results = {}
+
+    @property
+    def results(self):
+        """
+        :return: dict {stage: {'best': seconds, 'median': seconds, 'runs': list of seconds}}
+        """
+        return self._results
+
+    def run(self, name, func, setup=None, teardown=None):
+        """
+        :param func: stage to be timed, as func(prepared), or func() without setup.
+        :param setup: function called before each run (not timed). Its return value is passed to func.
+        :param teardown: function called after each run (not timed), as teardown(prepared), such as closing a database.
+        :return: result of last run of func.
+        """
+        runs = []
+        result = None
+        for _ in range(self._repeat):
+            with open(os.devnull, 'w') as devnull, \
+                    contextlib.redirect_stdout(devnull if self._quiet else sys.stdout):
+                prepared = None if setup is None else setup()
+                start = time.perf_counter()
+                try:
+                    result = func() if setup is None else func(prepared)
+                    runs.append(time.perf_counter() - start)
+                finally:
+                    if teardown is not None:
+                        teardown(prepared)
+        self._results[name] = {'best': min(runs), 'median': statistics.median(runs), 'runs': runs}
+        print('%-40s best %9.4f s   median %9.4f s' % (name, min(runs), statistics.median(runs)))
+        return result
+
+
+def run_all(config, bench, workdir, formats):
+    """
+    :param config: Config of the synthetic project.
+    :param bench: Benchmark obj.
+    :param workdir: temporary folder for database, caches and exported files.
+    :param formats: export formats to be timed.
+    """
+    def analyzer_of(**kw):
+        settings = config.as_dict()
+        settings.update(kw)
+        return TextAnalyzer(Config(**settings))
+
+    no_cache = dict(cache_dir='')
+    cache_dir = os.path.join(workdir, 'cache')
+    # 1. LOC.xlsx
+    bench.run('read_all_strings_from_xlsx (no cache)', lambda a: a.read_all_strings_from_xlsx(),
+              lambda: analyzer_of(**no_cache))
+    analyzer_of(cache_dir=cache_dir).read_all_strings_from_xlsx()  # 预热缓存
+    bench.run('read_all_strings_from_xlsx (cached)', lambda a: a.read_all_strings_from_xlsx(),
+              lambda: analyzer_of(cache_dir=cache_dir))
+    # 2. 各个扫描阶段
+    analyzer = analyzer_of(**no_cache)
+    analyzer.read_all_strings_from_xlsx()
+    prefabs, sources, workbooks = bench.run('walk_game_root', analyzer.walk_game_root)
+    bench.run('scan_activity_list', analyzer.scan_activity_list)
+    assets = bench.run('scan_prefab', lambda: analyzer.scan_prefab(prefabs.values()))
+    data = bench.run('scan_game_data (no cache)', lambda: analyzer.scan_game_data(workbooks.values()))
+    code = bench.run('scan_solution (no cache)', lambda: analyzer.scan_solution(sources))
+    cached = analyzer_of(cache_dir=cache_dir)
+    cached.read_all_strings_from_xlsx()
+    cached.scan_game_data(workbooks.values())  # 预热缓存
+    cached.scan_solution(sources)
+    bench.run('scan_game_data (cached)', lambda: cached.scan_game_data(workbooks.values()))
+    bench.run('scan_solution (cached)', lambda: cached.scan_solution(sources))
+    # 3. 数据库
+    database_path = os.path.join(workdir, 'bench.sqlite3')
+    texts_by_source = {'assets': assets, 'data': data, 'code': code}
+    rows = [(tid, loc, src) for src, texts in texts_by_source.items() for tid, loc in texts]
+
+    def new_database():
+        for each in [database_path, database_path + '-wal', database_path + '-shm']:  # 包括WAL模式的附属文件
+            if os.path.exists(each):
+                os.remove(each)
+        return TextDataBase.create_new(database_path)
+
+    def close_database(db):
+        if db is not None:
+            db.close()  # Windows上打开着的文件不能删除，下一次new_database()之前必须关闭
+
+    bench.run('TextDataBase.replace_sources_streaming',
+              lambda db: db.replace_sources_streaming(texts_by_source.keys(), rows), new_database, close_database)
+    text_db = TextDataBase.open_old(database_path)
+    used = bench.run('TextDataBase.iter_all', lambda: list(text_db.iter_all()))
+    text_ids = set(tid for tid, _ in used)
+    bench.run('TextDataBase.filter_used', lambda: text_db.filter_used(text_ids))
+    bench.run('TextDataBase.record_run', lambda: text_db.record_run(config.game_root))
+    runs = text_db.read_runs()
+    bench.run('TextDataBase.diff_runs', lambda: text_db.diff_runs(runs[0][0], runs[-1][0]))
+    # 4. 分析、导出
+    analyzer.load_database(text_db)
+    result = bench.run('analyze', analyzer.analyze)
+    bench.run('TextDataBase.read_all_unused', text_db.read_all_unused)
+    for fmt in formats:
+        os.chdir(workdir)  # 导出的文件在工作目录里
+        bench.run('dump_result (%s)' % fmt, lambda: analyzer.dump_result(result['unused'], fmt))
+    text_db.close()
+    # 5. 完整的扫描：新数据库，以及没有文件变化时的增量扫描
+    full = analyzer_of(database_path=database_path, cache_dir=cache_dir)
+    full.read_all_strings_from_xlsx()
+    bench.run('scan_changed (all files)', lambda db: full.scan_changed(db),
+              lambda: full.open_database(create=True, clear=True), close_database)
+    bench.run('scan_changed (no change)', lambda db: full.scan_changed(db), lambda: full.open_database(),
+              close_database)
+
+
+def compare(results, baseline, tolerance):
+    """
+    :return: count of stages slower than baseline by more than tolerance (such as 0.1 for 10%).
+    """
+    slower = 0
+    print('\n%-40s %10s %10s %8s' % ('stage', 'baseline', 'now', 'ratio'))
+    for name, now in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = now['best'] / old['best'] if old['best'] > 0 else float('inf')
+        mark = ''
+        if ratio > 1 + tolerance and now['best'] - old['best'] > 0.001:  # 太短的阶段只有噪声
+            mark = '  <-- slower'
+            slower += 1
+        print('%-40s %10.4f %10.4f %7.2fx%s' % (name, old['best'], now['best'], ratio, mark))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time each step of LingoMan.')
+    parser.add_argument('--config', required=True, help='settings of the project (written by generate.py)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, help='worker processes of scanners. Default: from config')
+    parser.add_argument('--formats', default='xlsx-streaming,csv', help='export formats, separated by comma')
+    parser.add_argument('--output', help='write results to JSON file')
+    parser.add_argument('--baseline', help='JSON file of earlier results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown against baseline')
+    parser.add_argument('--verbose', action='store_true', help='keep console output of stages')
+    args = parser.parse_args(argv)
+    config = Config.load(args.config).update(scan_workers=args.workers)
+    bench = Benchmark(args.repeat, quiet=not args.verbose)
+    workdir = tempfile.mkdtemp(prefix='lingoman-bench-')
+    cwd = os.getcwd()
+    try:
+        run_all(config, bench, workdir, [i for i in args.formats.split(',') if len(i) > 0])
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {
+        'time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': config.as_dict(),
+        'stages': bench.results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as ofs:
+            json.dump(report, ofs, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as ifs:
+            baseline = json.load(ifs)
+        if compare(bench.results, baseline['stages'], args.tolerance) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
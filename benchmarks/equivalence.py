@@ -0,0 +1,297 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Check that the optimized code paths give the same results as the straightforward code they replaced, on random inputs:
+  tokenizer    SeparatorTokenizer.split / split_all against the old StringSplit loop
+  sections     SectionResolver against the old alternation regexes of sheet names and the old has_section_only loop
+  game data    scan_game_data_file against the old row-by-row scan of pandas frames
+  asset        memory-mapped scan_prefab_file against the old line-by-line scan
+  analysis     merged passes of TextAnalyzer.analyze against the old three passes with brute-force substring search
+Reference implementations here are the old code, kept only for these comparisons.
+Coding Example:
+    python benchmarks/equivalence.py --rounds 20 --seed 7
+    python benchmarks/equivalence.py --checks sections,asset
+Exit code is 1 if any check finds a difference. The first differences of each check are printed.
+"""
+import argparse
+import contextlib
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import Config, TextAnalyzer
+from database import TextDataBase
+from matcher import SectionResolver
+from scanner import SeparatorTokenizer, scan_game_data_file, scan_prefab_file
+
+SEPARATORS = '|;, '
+WORDS = ['title', 'desc', 'Tips', 'name', 'ok', 'x', '1', 'hero_2', u'标题']
+
+
+class StringSplit:
+    """
+    Old tokenizer of cells in data workbooks (replaced by SeparatorTokenizer).
+    """
+    def __init__(self, separators):
+        self._regex = re.compile('([^%s]+)[%s]*?(.*)' % (separators, separators))
+
+    def split(self, target):
+        strings = []
+        while len(target) > 0:
+            result = self._regex.search(target)
+            if result is None:
+                return strings
+            strings.append(result.group(1))
+            target = result.group(2)
+        return strings
+
+
+def old_has_section_only(name, sections):
+    for section in sections:
+        if name.startswith(section) and len(name) - len(section) < 2:
+            return True
+    return False
+
+
+def old_data_regex(sections):
+    return re.compile(r'^((%s)(\w+|{.+})*)' % '|'.join([i + '_' for i in sections]))
+
+
+def old_csharp_regex(sections):
+    return re.compile(r'(%s)_(?:[^\s{}]|{[^{}]*})*$' % '|'.join(re.escape(i) for i in sections))
+
+
+def old_scan_game_data_file(workbook, sections):
+    import pandas as pd
+    each_dir, full_file_name = workbook
+    strings = set()
+    regex = old_data_regex(sections)
+    splitor = StringSplit(SEPARATORS)
+    location = '%s - %s' % (each_dir, os.path.basename(full_file_name))
+    for sheet, frame in pd.read_excel(full_file_name, sheet_name=None).items():
+        for each_row in range(len(frame.index)):
+            for each_col in range(len(frame.columns)):
+                cell = frame.values[each_row, each_col]
+                if not isinstance(cell, str):
+                    continue
+                for each_str in splitor.split(cell):
+                    result = regex.match(each_str)
+                    if result is not None and not old_has_section_only(result.group(1), sections):
+                        strings.add((result.group(1), location))
+    return strings
+
+
+def old_scan_prefab_file(full_file_name, sections):
+    strings = set()
+    file = os.path.basename(full_file_name)
+    regex = re.compile(r'stringLocKey:\s+(\w+)')
+    with open(full_file_name, 'r', encoding='utf-8') as ifs:
+        for line in ifs:
+            result = regex.search(line)
+            if result is not None:
+                text_id = result.group(1).strip()
+                if not old_has_section_only(text_id, sections):
+                    strings.add((text_id, file))
+    return strings
+
+
+def old_analyze(all_strings, id_used):
+    """
+    :return: tuple(possible used, possible spelling mistakes, undefined, unused), as the old three passes found them.
+    """
+    undefined = id_used - all_strings
+    unused = all_strings - id_used
+    regex_csharp = re.compile(r'(\w+)({.+})(\w*)')
+    possible = [{}, {}]
+    for case, fold in enumerate([lambda i: i, str.lower]):
+        pairs = [(fold(i), i) for i in all_strings]
+        for each in undefined:
+            regex = None
+            if regex_csharp.match(each):
+                regex = re.compile(regex_csharp.sub(r'\1([a-zA-Z0-9_]+)\3', fold(each)))
+            found = set(full for folded, full in pairs
+                        if folded.find(fold(each)) > -1 or (regex is not None and regex.match(folded)))
+            if len(found) > 0:
+                possible[case][each] = found
+        undefined = undefined - set(possible[case].keys())
+        for found in possible[case].values():
+            unused = unused - found
+    return possible[0], possible[1], undefined, unused
+
+
+class Checker:
+    def __init__(self, rng, workdir):
+        self._rng = rng
+        self._workdir = workdir
+        self._projects = 0
+        self.differences = []  # tuple(check, case, expected, actual)
+
+    def compare(self, check, case, expected, actual):
+        if expected != actual:
+            self.differences.append((check, case, expected, actual))
+
+    def sheets(self):
+        names = ['LC', 'LC_UI', 'LC_UI_X', 'LC_COMMON', 'Lc_ui', 'TIPS', 'A.B', 'LC_SKILL']
+        return self._rng.sample(names, self._rng.randint(2, len(names)))
+
+    def text(self, sheets, pieces=3):
+        """
+        :return: random string which may contain text IDs, separators, templates and line breaks.
+        """
+        parts = []
+        for _ in range(self._rng.randint(1, pieces)):
+            parts.append(self._rng.choice([
+                self._rng.choice(sheets) + '_' + '_'.join(self._rng.sample(WORDS, self._rng.randint(0, 2))),
+                self._rng.choice(sheets) + '_{name}_' + self._rng.choice(WORDS),
+                self._rng.choice(sheets),
+                self._rng.choice(WORDS) + ' ' + self._rng.choice(WORDS),
+                '']))
+            parts.append(''.join(self._rng.choice(SEPARATORS + '\n') for _ in range(self._rng.randint(0, 3))))
+        return ''.join(parts)
+
+    def check_tokenizer(self, count=500):
+        import pandas as pd
+        sheets = self.sheets()
+        old, new = StringSplit(SEPARATORS), SeparatorTokenizer(SEPARATORS)
+        cells = [self.text(sheets) for _ in range(count)]
+        for cell in cells:
+            self.compare('tokenizer', cell, old.split(cell), new.split(cell))
+        pieces = sorted(new.split_all(pd.Series(cells, dtype=object)).tolist())
+        self.compare('tokenizer', 'split_all', sorted(i for cell in cells for i in old.split(cell)), pieces)
+
+    def check_sections(self, count=2000):
+        sheets = self.sheets()
+        resolver = SectionResolver(sheets)
+        data_regex, csharp_regex = old_data_regex(sheets), old_csharp_regex(sheets)
+        tail = re.compile(r'(\w+|{.+})*')
+        csharp_tail = re.compile(r'(?:[^\s{}]|{[^{}]*})*$')
+        for _ in range(count):
+            piece = self._rng.choice(SEPARATORS + '\n').join(self.text(sheets, 2).split('\n'))
+            result = data_regex.match(piece)
+            section = resolver.section_of(piece)
+            text_id = None if section is None else piece[:tail.match(piece, len(section) + 1).end()]
+            self.compare('sections', piece, None if result is None else result.group(1), text_id)
+            literal = piece.strip(SEPARATORS)
+            section = resolver.section_of(literal)
+            matched = section is not None and csharp_tail.match(literal, len(section) + 1) is not None
+            self.compare('sections', literal, csharp_regex.match(literal) is not None, matched)
+            self.compare('sections', piece, old_has_section_only(piece, sheets), resolver.is_section_only(piece))
+
+    def check_game_data(self, count=3):
+        import pandas as pd
+        for i in range(count):
+            sheets = self.sheets()
+            full_file_name = os.path.join(self._workdir, 'Data%d.xlsx' % i)
+            with pd.ExcelWriter(full_file_name) as writer:
+                for j in range(self._rng.randint(1, 3)):
+                    rows = self._rng.randint(1, 60)
+                    frame = pd.DataFrame({
+                        'Id': list(range(rows)),
+                        'Name': [self.text(sheets) for _ in range(rows)],
+                        'Value': [self._rng.choice([self._rng.random(), self.text(sheets), None]) for _ in range(rows)]
+                    })
+                    frame.to_excel(writer, sheet_name='Sheet%d' % j, index=False)
+            workbook = ('GameDatasNew/Client', full_file_name)
+            self.compare('game data', full_file_name, old_scan_game_data_file(workbook, sheets),
+                         scan_game_data_file(workbook, sheets))
+
+    def check_prefabs(self, count=20):
+        for i in range(count):
+            sheets = self.sheets()
+            lines = []
+            for _ in range(self._rng.randint(0, 200)):
+                key = self.text(sheets, 1).replace('\n', '')
+                lines.append(self._rng.choice([
+                    '  stringLocKey: %s' % key,
+                    '  stringLocKey:\t%s  ' % key,
+                    '  stringLocKey: ',
+                    '  m_Name: %s' % key,
+                    '--- !u!114 &%d' % self._rng.randint(1, 1 << 30)]))
+            full_file_name = os.path.join(self._workdir, 'Asset%d.prefab' % i)
+            with open(full_file_name, 'w', encoding='utf-8', newline=self._rng.choice(['\n', '\r\n'])) as ofs:
+                ofs.write('\n'.join(lines) + '\n')
+            self.compare('asset', full_file_name, old_scan_prefab_file(full_file_name, sheets),
+                         scan_prefab_file(full_file_name, sheets))
+
+    def check_analysis(self, count=2):
+        import pandas as pd
+        for i in range(count):
+            self._projects += 1
+            root = os.path.join(self._workdir, 'project%d' % self._projects)
+            os.makedirs(os.path.join(root, 'Assets', 'Text'))
+            ids = {}
+            with pd.ExcelWriter(os.path.join(root, 'Assets', 'Text', 'LOC.xlsx')) as writer:
+                for sheet in ['LC_COMMON', 'LC_UI', 'LC_SKILL']:
+                    ids[sheet] = sorted(set('_'.join(self._rng.sample(WORDS, self._rng.randint(1, 3)))
+                                            for _ in range(80)))
+                    pd.DataFrame({'ID': ids[sheet], 'en': ids[sheet]}).to_excel(writer, sheet_name=sheet, index=False)
+            all_strings = set('%s_%s' % (sheet, i) for sheet, names in ids.items() for i in names)
+            used = set()
+            for tid in self._rng.sample(sorted(all_strings), len(all_strings) // 3):
+                dice = self._rng.random()
+                if dice < 0.1:
+                    tid = tid[:self._rng.randint(len(tid) - 3, len(tid) - 1)]  # 截掉末尾几个字符
+                elif dice < 0.2:
+                    tid = self._rng.choice([str.upper, str.lower, str.swapcase])(tid)
+                elif dice < 0.3:
+                    parts = tid.split('_')
+                    parts[-1] = '{name}'
+                    tid = '_'.join(parts)
+                elif dice < 0.35:
+                    tid += '_undefined'
+                used.add(tid)
+            database_path = os.path.join(root, 'texts.sqlite3')
+            text_db = TextDataBase.create_new(database_path)
+            text_db.insert_batch([(tid, 'x.prefab') for tid in used])
+            analyzer = TextAnalyzer(Config(game_root=root, database_path=database_path, cache_dir=''))
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                analyzer.read_all_strings_from_xlsx()
+                analyzer.load_database(text_db)
+                result = analyzer.analyze()
+            text_db.close()
+            expected = old_analyze(all_strings, used)
+            actual = (result['possible_used'], result['misspelled'], set(result['undefined'].keys()), result['unused'])
+            for name, old, new in zip(['possible used', 'misspelled', 'undefined', 'unused'], expected, actual):
+                self.compare('analysis', '%s of %s' % (name, root), old, new)
+
+
+CHECKS = {
+    'tokenizer': Checker.check_tokenizer,
+    'sections': Checker.check_sections,
+    'game data': Checker.check_game_data,
+    'asset': Checker.check_prefabs,
+    'analysis': Checker.check_analysis
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare optimized code paths with the old ones on random inputs.')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--checks', default=','.join(CHECKS.keys()), help='checks to run, separated by comma')
+    parser.add_argument('--limit', type=int, default=5, help='max count of differences printed for each check')
+    args = parser.parse_args(argv)
+    failures = 0
+    for name in [i for i in args.checks.split(',') if len(i) > 0]:
+        workdir = tempfile.mkdtemp(prefix='lingoman-equivalence-')
+        try:
+            checker = Checker(random.Random(args.seed), workdir)
+            for _ in range(args.rounds):
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):  # 扫描器打印的错误
+                    CHECKS[name](checker)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        differences = checker.differences
+        print('%-12s %s' % (name, 'OK' if len(differences) == 0 else '%d differences' % len(differences)))
+        for check, case, expected, actual in differences[:args.limit]:
+            print('  %r\n    expected: %r\n    actual:   %r' % (case, expected, actual))
+        failures += len(differences)
+    return 1 if failures > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Generate a synthetic Unity project for benchmarks: LOC.xlsx, prefabs (and scenes, ScriptableObjects),
+C# sources, data workbooks and an activity template list. Same seed and sizes give the same project.
+Most text IDs are used somewhere; some are unused, some used IDs are undefined or misspelled (different case),
+and some C# code uses interpolated templates, so every branch of the analysis has work to do.
+Coding Example:
+    python benchmarks/generate.py /tmp/synthetic --sheets 20 --ids 2000 --prefabs 2000 --sources 3000 --workbooks 40
+Settings of the project are written to <root>.json, for cli.py and bench.py.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import TextAnalyzer
+
+ARABIC = u'مرحبا'
+WORDS = ['title', 'desc', 'tips', 'name', 'button', 'confirm', 'cancel', 'reward', 'shop', 'hero', 'skill', 'battle']
+
+
+class ProjectGenerator:
+    """
+    Coding Example:
+        generator = ProjectGenerator('/tmp/synthetic', sheets=10, ids=500, seed=1)
+        generator.generate(prefabs=500, sources=500, workbooks=10)
+    """
+    def __init__(self, root, sheets=10, ids=500, seed=1):
+        """
+        :param root: folder of project. It's created if not existing.
+        :param sheets: count of sheets in LOC.xlsx
+        :param ids: count of text IDs in each sheet.
+        :param seed: seed of random numbers.
+        """
+        self._root = root
+        self._random = random.Random(seed)
+        self._sheets = ['LC_S%02d' % i for i in range(sheets)]
+        self._ids = {}  # {sheet: list of IDs}
+        for sheet in self._sheets:
+            self._ids[sheet] = ['%s_%d' % (self._random.choice(WORDS), i) for i in range(ids)]
+
+    def path(self, *parts):
+        full_name = os.path.join(self._root, *parts)
+        os.makedirs(os.path.dirname(full_name), exist_ok=True)
+        return full_name
+
+    def text_id(self):
+        """
+        :return: a random text ID in use. 2% are undefined, 1% differ in case (spelling mistakes).
+        """
+        sheet = self._random.choice(self._sheets)
+        tid = '%s_%s' % (sheet, self._random.choice(self._ids[sheet][:len(self._ids[sheet]) * 9 // 10]))  # 最后10%不使用
+        dice = self._random.random()
+        if dice < 0.02:
+            return tid + '_undefined'
+        if dice < 0.03:
+            return tid.upper()
+        return tid
+
+    def generate(self, prefabs=500, sources=500, workbooks=10):
+        self.write_loc_book()
+        self.write_assets(prefabs)
+        self.write_sources(sources)
+        self.write_workbooks(workbooks)
+        self.write_activity_list()
+        with open(self.path('UnityExperiment.sln'), 'w') as ofs:
+            ofs.write('Microsoft Visual Studio Solution File, Format Version 12.00\n')
+
+    def write_loc_book(self):
+        import pandas as pd
+        with pd.ExcelWriter(self.path('Assets', 'Text', 'LOC.xlsx')) as writer:
+            for sheet in self._sheets:
+                ids = self._ids[sheet]
+                frame = pd.DataFrame({
+                    'ID': ids,
+                    'en': ['%s %s' % (sheet, i) for i in ids],
+                    'zh': [u'文本 %s' % i for i in ids],
+                    'ar': [ARABIC if self._random.random() < 0.8 else '' for _ in ids]  # 部分没有翻译成阿拉伯文
+                })
+                frame.to_excel(writer, sheet_name=sheet, index=False)
+
+    def write_assets(self, count):
+        extensions = ['.prefab'] * 8 + ['.unity', '.asset']
+        for i in range(count):
+            ext = extensions[i % len(extensions)]
+            lines = ['%YAML 1.1', '%TAG !u! tag:unity3d.com,2011:']
+            for j in range(self._random.randint(20, 80)):
+                lines.append('--- !u!4 &%d' % (i * 1000 + j))
+                lines.append('Transform:')
+                lines.append('  m_LocalPosition: {x: %d, y: 0, z: 0}' % j)
+                lines.append('  m_LocalRotation: {x: 0, y: 0, z: 0, w: 1}')
+                if self._random.random() < 0.3:
+                    lines.append('--- !u!114 &%d' % (i * 1000 + 500 + j))
+                    lines.append('MonoBehaviour:')
+                    lines.append('  stringLocKey: %s' % self.text_id())
+            with open(self.path('Assets', 'UI', 'Asset%05d%s' % (i, ext)), 'w', encoding='utf-8') as ofs:
+                ofs.write('\n'.join(lines) + '\n')
+
+    def write_sources(self, count):
+        for i in range(count):
+            lines = ['using UnityEngine;', '', 'public class Script%05d : MonoBehaviour' % i, '{']
+            for j in range(self._random.randint(20, 120)):
+                dice = self._random.random()
+                if dice < 0.15:
+                    lines.append('    string s%d = "%s";  // "comment"' % (j, self.text_id()))
+                elif dice < 0.18:
+                    sheet = self._random.choice(self._sheets)
+                    lines.append('    string t%d => $"%s_{name}_%d";' % (j, sheet, j))
+                elif dice < 0.2:
+                    lines.append('    string v%d = @"Verbatim ""%d"" text";' % (j, j))
+                else:
+                    lines.append('    void Method%d(int a) { if (a > %d) { Debug.Log(a * 2); } }' % (j, j))
+            lines.append('}')
+            encoding = 'gbk' if i % 10 == 0 else 'utf-8'
+            with open(self.path('Assets', 'Scripts', 'Script%05d.cs' % i), 'w', encoding=encoding) as ofs:
+                ofs.write(u'// 自动生成的代码\n' + '\n'.join(lines) + '\n')
+
+    def write_workbooks(self, count):
+        """
+        .xls workbooks are written by xlwt if it's installed. Otherwise they're xlsx inside (with .xls names),
+        which pandas still reads, because it detects format by content.
+        """
+        import pandas as pd
+        folders = TextAnalyzer.GAME_DATA_FOLDERS
+        for i in range(count):
+            rows = self._random.randint(50, 300)
+            frame = pd.DataFrame({
+                'Id': list(range(rows)),
+                'Name': [self.text_id() for _ in range(rows)],
+                'Tips': [';'.join(self.text_id() for _ in range(self._random.randint(1, 3))) for _ in range(rows)],
+                'Value': [self._random.random() for _ in range(rows)]
+            })
+            folder = folders[i % len(folders)].split('/')
+            full_name = self.path('config', *folder, 'Data%03d.xls' % i)
+            try:
+                frame.to_excel(full_name, index=False, engine='xlwt')
+            except (ImportError, ValueError):
+                with pd.ExcelWriter(full_name, engine='openpyxl') as writer:
+                    frame.to_excel(writer, index=False)
+
+    def write_activity_list(self, count=50):
+        data = []
+        for i in range(count):
+            data.append({'Id': i, 'Title': self.text_id(), 'IconTitle': self.text_id(), 'Desc': self.text_id(),
+                         'ShortDesc': '', 'Rule': self.text_id() if i % 2 == 0 else ''})
+        with open(self.path('activities.json'), 'w', encoding='utf-8') as ofs:
+            json.dump({'type': 'rule_aty', 'data': data}, ofs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic Unity project for benchmarks.')
+    parser.add_argument('root', help='folder of project')
+    parser.add_argument('--sheets', type=int, default=10)
+    parser.add_argument('--ids', type=int, default=500, help='text IDs in each sheet')
+    parser.add_argument('--prefabs', type=int, default=500, help='Unity asset files (prefabs, scenes, assets)')
+    parser.add_argument('--sources', type=int, default=500, help='C# source files')
+    parser.add_argument('--workbooks', type=int, default=10, help='data workbooks')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    root = os.path.abspath(args.root)
+    ProjectGenerator(root, args.sheets, args.ids, args.seed).generate(args.prefabs, args.sources, args.workbooks)
+    config = {
+        'game_root': root,
+        'database_path': root + '.sqlite3',
+        'roslyn_finder': '',
+        'csharp_scanner': 'builtin',
+        'activity_list': os.path.join(root, 'activities.json'),
+        'cache_dir': root + '.cache'
+    }
+    with open(root + '.json', 'w', encoding='utf-8') as ofs:
+        json.dump(config, ofs, indent=2)
+    print('Project: %s\nConfig: %s.json' % (root, root))
+
+
+if __name__ == "__main__":
+    main()
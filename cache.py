@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of data parsed from source files (such as Excel workbooks), which are slow to parse.
+"""
+import os
+import hashlib
+import pickle
+import threading
+import time
+
+_last_evicted = {}  # 每个进程最近一次清理缓存的时间：{folder: time}
+_encodings_lock = threading.Lock()  # 同时运行的阶段（线程）都可能保存编码
+
+
+def file_digest(filename, block_size=1 << 20):
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as ifs:
+        for block in iter(lambda: ifs.read(block_size), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class FileCache:
+    """
+    Each entry is a pickle file in cache folder: a header (source path, size, mtime, hash), then the parsed data.
+    An entry is valid if its source file keeps the same size and mtime. Otherwise the content hash is compared.
+    Least recently used entries are evicted when the folder grows over the size limit.
+    Eviction lists the whole folder, so it's done at most once per EVICT_INTERVAL seconds in each process.
+    Many small entries (such as one per source file) can be written without listing the folder each time.
+    Coding Example:
+        cache = FileCache('cache', tag='cells')
+        cells = cache.load(workbook, read_string_cells)
+    """
+    EXT = '.pkl'
+    EVICT_INTERVAL = 10  # 秒
+
+    def __init__(self, folder, size_limit=512 << 20, tag=''):
+        """
+        :param folder: cache folder. It's created if not existing.
+        :param size_limit: max total size (in bytes) of all entries.
+        :param tag: kind of cached data. Same file can be cached with different tags.
+        """
+        self._folder = folder
+        self._size_limit = size_limit
+        self._tag = tag
+        os.makedirs(folder, exist_ok=True)
+
+    def entry_name(self, filename):
+        key = '%s|%s' % (self._tag, os.path.abspath(filename))
+        return os.path.join(self._folder, hashlib.md5(key.encode('utf-8')).hexdigest() + FileCache.EXT)
+
+    def get(self, filename):
+        """
+        :return: cached data of the file. None if not cached or out of date.
+        """
+        entry = self.entry_name(filename)
+        try:
+            with open(entry, 'rb') as ifs:
+                header = pickle.load(ifs)
+                stat = os.stat(filename)
+                touched = (header['size'], header['mtime']) != (stat.st_size, stat.st_mtime)
+                if touched and (header['size'] != stat.st_size or header['hash'] != file_digest(filename)):
+                    ifs.close()
+                    os.remove(entry)  # 源文件变了，缓存作废
+                    return None
+                data = pickle.load(ifs)
+            if touched:  # 内容没变，只是mtime变了：更新记录，下次不必再算hash
+                self.put(filename, data)
+            else:
+                os.utime(entry)  # 最近使用过的，最后才被清理
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print('Error on reading cache of %s: %s' % (filename, e))
+            return None
+
+    def put(self, filename, data):
+        entry = self.entry_name(filename)
+        temp = '%s.%d.tmp' % (entry, os.getpid())  # 多个进程可能同时写缓存
+        try:
+            stat = os.stat(filename)
+            header = {'path': os.path.abspath(filename), 'size': stat.st_size, 'mtime': stat.st_mtime,
+                      'hash': file_digest(filename)}
+            with open(temp, 'wb') as ofs:
+                pickle.dump(header, ofs, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, ofs, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, entry)
+        except Exception as e:
+            print('Error on writing cache of %s: %s' % (filename, e))
+            return
+        now = time.monotonic()
+        if now - _last_evicted.get(self._folder, -FileCache.EVICT_INTERVAL) >= FileCache.EVICT_INTERVAL:
+            _last_evicted[self._folder] = now
+            self.evict()
+
+    def load(self, filename, parse):
+        """
+        :param filename: source file.
+        :param parse: function as parse(filename), called only if there's no valid cache.
+        :return: data parsed from file.
+        """
+        data = self.get(filename)
+        if data is None:
+            data = parse(filename)
+            self.put(filename, data)
+        return data
+
+    def evict(self):
+        """
+        Remove least recently used entries until total size is under the limit.
+        """
+        entries = []
+        with os.scandir(self._folder) as it:
+            for entry in it:
+                if entry.name.endswith(FileCache.EXT):
+                    try:
+                        stat = entry.stat()
+                    except OSError:  # 被别的进程清理了
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(i[1] for i in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._size_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+class EncodingCache:
+    """
+    Encodings of text files detected by scanner.try_read_text_file(), in one pickle file of cache folder:
+    {full file name: (size, mtime, encoding)}. It's small, so each process which decodes files (worker processes too)
+    loads it whole, and encodings detected by workers are saved by main process after each scan (see ScanEngine).
+    Coding Example:
+        encodings = EncodingCache('cache')
+        encodings.update({'/data/Assets/Scripts/Foo.cs': (1024, 1700000000.0, 'gbk')})
+        print(encodings.load())
+    """
+    FILE_NAME = 'encodings.pkl'
+
+    def __init__(self, folder):
+        """
+        :param folder: cache folder. It's created if not existing.
+        """
+        self._filename = os.path.join(folder, EncodingCache.FILE_NAME)
+        os.makedirs(folder, exist_ok=True)
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def load(self):
+        """
+        :return: dict {full file name: (size, mtime, encoding)}. Empty if there's no cache yet.
+        """
+        try:
+            with open(self._filename, 'rb') as ifs:
+                return pickle.load(ifs)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print('Error on reading encodings: %s' % e)
+            return {}
+
+    def update(self, entries):
+        """
+        :param entries: dict {full file name: (size, mtime, encoding)}, added to (or replacing) cached ones.
+        """
+        if len(entries) == 0:
+            return
+        with _encodings_lock:
+            encodings = self.load()
+            encodings.update(entries)
+            temp = '%s.%d.tmp' % (self._filename, os.getpid())
+            try:
+                with open(temp, 'wb') as ofs:
+                    pickle.dump(encodings, ofs, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp, self._filename)
+            except Exception as e:
+                print('Error on writing encodings: %s' % e)
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Command line of LingoMan, for build servers (no window, no message box).
+Each sub-command prints one JSON object to stdout (or --output file). Logs of all steps go to stderr.
+Coding Example:
+    python cli.py --config lingoman.json scan --activity-list activities.json
+    python cli.py --config lingoman.json analyze --export
+    python cli.py --game-root /data/UnityExperiment --database /data/texts.sqlite3 diff
+    python cli.py --config lingoman.json --trace-memory --profile asset scan
+    python cli.py --config lingoman.json --output metrics.json metrics
+Exit code is 0 on success, 1 on failure (JSON has an "error" field then).
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from core import Config, TextAnalyzer
+from export import EXPORT_FORMATS
+
+
+def open_analyzer(analyzer, load=True, strings=True):
+    """
+    :param load: read usages of last scan from database.
+    :param strings: read all text IDs of LOC.xlsx (it requires pandas).
+    :return: TextDataBase obj.
+    """
+    text_db = analyzer.open_database()
+    if text_db is None:
+        raise RuntimeError('No valid database: %s' % analyzer.config.database_path)
+    if load:
+        if analyzer.load_database(text_db) == 0:  # 正常情况下，游戏肯定会用到大量文本
+            raise RuntimeError('No data is found in database!')
+    if strings:
+        analyzer.read_all_strings_from_xlsx()
+    return text_db
+
+
+def cmd_scan(analyzer, args):
+    text_db = analyzer.open_database(create=True)
+    if text_db is None:
+        raise RuntimeError('No valid database: %s' % analyzer.config.database_path)
+    analyzer.read_all_strings_from_xlsx()
+    changed = analyzer.scan_changed(text_db, full=args.full)
+    runs = text_db.read_runs()
+    return {
+        'changed_files': changed,
+        'files': dict(analyzer.file_counts),
+        'used_text_ids': len(analyzer.used_strings.text_ids),
+        'stages': {name: round(seconds, 3) for name, seconds in analyzer.stage_timings.items()},
+        'run': runs[-1][0] if len(runs) > 0 else None,
+        'metrics': text_db.read_metrics(runs[-1][0]) if len(runs) > 0 else []
+    }
+
+
+def cmd_analyze(analyzer, args):
+    open_analyzer(analyzer)
+    result = analyzer.analyze()
+    if args.export:
+        result['outputs'] = analyzer.dump_result(result['unused'], args.format)
+    return result
+
+
+def cmd_update_unused(analyzer, args):
+    open_analyzer(analyzer, load=False, strings=False)
+    return {'appended': analyzer.update_unused_manually(args.file)}
+
+
+def cmd_double_check(analyzer, args):
+    open_analyzer(analyzer, load=False, strings=False)
+    hits = analyzer.double_check(args.report)
+    return {'hits': {} if hits is None else hits}
+
+
+def cmd_export(analyzer, args):
+    open_analyzer(analyzer, load=False)
+    if args.arabic:
+        outputs = analyzer.dump_result_arabic(fmt=args.format)
+    else:
+        outputs = analyzer.dump_result(fmt=args.format)
+    return {'outputs': outputs}
+
+
+def cmd_diff(analyzer, args):
+    open_analyzer(analyzer, load=False, strings=False)
+    diff = analyzer.diff_last_runs()
+    if diff is None:
+        raise RuntimeError('At least two runs are required!')
+    old, new, added, removed, changed = diff
+    return {
+        'old_run': {'id': old[0], 'time': old[1], 'game_root': old[2], 'revision': old[3], 'usages': old[4]},
+        'new_run': {'id': new[0], 'time': new[1], 'game_root': new[2], 'revision': new[3], 'usages': new[4]},
+        'added': added,
+        'removed': removed,
+        'changed': {tid: {'added': plus, 'removed': minus} for tid, (plus, minus) in changed.items()}
+    }
+
+
+def cmd_metrics(analyzer, args):
+    open_analyzer(analyzer, load=False, strings=False)
+    metrics = analyzer.read_metrics(args.run)
+    if metrics is None:
+        raise RuntimeError('No such run: %s' % ('latest' if args.run is None else args.run))
+    return metrics
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='lingoman', description='Find used, unused and undefined texts of game.')
+    parser.add_argument('--config', help='JSON file of settings (keys of core.Config)')
+    parser.add_argument('--game-root', help='Unity project folder')
+    parser.add_argument('--database', dest='database_path', help='SQLite database of text usages')
+    parser.add_argument('--roslyn-finder', help='tool to collect text IDs in C# solution. Empty: built-in lexer')
+    parser.add_argument('--csharp-scanner', choices=['roslyn', 'builtin'], help='how C# code is scanned')
+    parser.add_argument('--workers', dest='scan_workers', type=int, help='worker processes. 0: one per CPU core')
+    parser.add_argument('--cache-dir', help='cache folder of parsed workbooks. Empty: no cache')
+    parser.add_argument('--trace-memory', action='store_const', const=True, help='record peak memory of each stage')
+    parser.add_argument('--profile', dest='profile_stages', action='append',
+                        help='profile this stage by cProfile (repeatable). "*": all stages')
+    parser.add_argument('--profile-dir', help='folder of profiles (<stage>.prof)')
+    parser.add_argument('--output', help='write JSON result to this file instead of stdout')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('scan', help='scan new or changed files, and record usages in database')
+    cmd.add_argument('--full', action='store_true', help='clear old data, and scan all files')
+    cmd.add_argument('--activity-list', help='activity template list (JSON)')
+    cmd.add_argument('--blacklist', help='ignore rules (text IDs, prefixes, globs, regexes), one per line. See matcher.IgnoreRules')
+    cmd.set_defaults(func=cmd_scan)
+
+    cmd = commands.add_parser('analyze', help='find undefined and unused text IDs')
+    cmd.add_argument('--export', action='store_true', help='export used and unused texts too')
+    cmd.add_argument('--format', choices=EXPORT_FORMATS.keys(), help='export format')
+    cmd.set_defaults(func=cmd_analyze)
+
+    cmd = commands.add_parser('update-unused', help='append text IDs found by people to table <unused>')
+    cmd.add_argument('file', help='text file, one text ID per line')
+    cmd.set_defaults(func=cmd_update_unused)
+
+    cmd = commands.add_parser('double-check', help='search unused text IDs in C# source files again')
+    cmd.add_argument('--report', default='double_check.txt', help='text report of hits')
+    cmd.set_defaults(func=cmd_double_check)
+
+    cmd = commands.add_parser('export', help='export rows of LOC.xlsx to used and unused workbooks')
+    cmd.add_argument('--arabic', action='store_true', help='put rows without Arabic translation to a separate output')
+    cmd.add_argument('--format', choices=EXPORT_FORMATS.keys(), help='export format')
+    cmd.set_defaults(func=cmd_export)
+
+    cmd = commands.add_parser('diff', help='compare the last two scan runs')
+    cmd.set_defaults(func=cmd_diff)
+
+    cmd = commands.add_parser('metrics', help='time, memory and counters of each stage of a run')
+    cmd.add_argument('--run', type=int, help='id of run. Default: the latest one')
+    cmd.set_defaults(func=cmd_metrics)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    result = {'command': args.command}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # stdout只输出JSON（包括读取配置时的警告）
+            config = Config.load(args.config) if args.config else Config()
+            settings = {key: getattr(args, key, None) for key in Config.DEFAULTS}
+            config.update(**settings)
+            analyzer = TextAnalyzer(config)
+            result.update(args.func(analyzer, args))
+        result['ok'] = True
+    except Exception as e:
+        print('Error on %s: %s' % (args.command, e), file=sys.stderr)
+        result['ok'] = False
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    # 集合输出成排好序的列表
+    text = json.dumps(result, default=sorted, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as ofs:
+            ofs.write(text + '\n')
+    else:
+        print(text)
+    return 0 if result['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,873 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Scan, analyze and export steps of LingoMan, without any GUI.
+Both the Tk window (main.py) and the command line (cli.py) drive TextAnalyzer.
+pandas is imported by the scanners and writers only when they're called, so steps on database alone start fast.
+"""
+import os
+import contextlib
+import hashlib
+import re
+import subprocess
+import json
+from cache import EncodingCache, FileCache, file_digest
+from database import TextStats, TextDataBase
+from export import ExportEngine, select_all, select_unused, select_untranslated
+from locbook import LocBook
+from matcher import CaseInsensitiveIndex, IgnoreRules, SectionResolver, TemplateMatcher
+from metrics import MetricsRecorder
+from scanner import try_read_text_file, ScanEngine, StageScheduler, TreeWalker, scan_csharp_file, scan_prefab_file, \
+    scan_game_data_file, search_source_file
+
+
+def read_revision(root):
+    """
+    :param root: working copy of git or svn.
+    :return: commit hash (git) or revision number (svn). None if it's not a working copy.
+    """
+    commands = [
+        ['git', '-C', root, 'rev-parse', 'HEAD'],
+        ['svn', 'info', '--show-item', 'revision', root]
+    ]
+    for cmd in commands:
+        try:
+            proc = subprocess.run(cmd, capture_output=True, encoding='utf-8')
+        except OSError:  # 没有安装
+            continue
+        if proc.returncode == 0:
+            return proc.stdout.strip()
+    return None
+
+
+def check_manifest(manifest, files):
+    """
+    Compare files on disk with the fingerprints recorded by last scan.\n
+    Content hash is computed only when size or mtime differs, so untouched files cost one stat() each.\n
+    :param manifest: dict {path: (size, mtime, hash)} read from database.
+    :param files: dict {path: full file name} of files found on disk now.
+    :return: tuple(changed paths, deleted paths, dict {path: (size, mtime, hash)} to be written back)
+    """
+    changed = set()
+    fingerprints = {}
+    for path, full_file_name in files.items():
+        stat = os.stat(full_file_name)
+        old = manifest.get(path)
+        if old is not None and old[0] == stat.st_size and old[1] == stat.st_mtime:
+            continue
+        digest = file_digest(full_file_name)
+        fingerprints[path] = (stat.st_size, stat.st_mtime, digest)
+        if old is None or old[2] != digest:  # 只是touch过（内容没变）的文件，不必重新扫描
+            changed.add(path)
+    deleted = set(manifest.keys()) - set(files.keys())
+    return changed, deleted, fingerprints
+
+
+class Config:
+    """
+    Settings of all steps. Defaults are those of the Windows workstation where LingoMan was born.
+    They can be overridden by a JSON file (with the same keys), then by keyword arguments (such as command-line options).
+    Coding Example:
+        config = Config.load('lingoman.json')
+        config.update(game_root='/data/UnityExperiment', scan_workers=None)
+    """
+    DEFAULTS = {
+        'game_root': r"D:\Projects\B2\UnityExperiment",
+        'database_path': r'D:\tools\LingoMan\text_stats.sqlite3',
+        'roslyn_finder': r'D:\demos\MySlnFindRef\FindTextRef\bin\Release\net472\FindTextRef.exe',
+        'csharp_scanner': 'roslyn',  # 'roslyn'：使用外部程序roslyn_finder（为空时改用内置的）；'builtin'：内置的C#词法分析
+        'solution': 'UnityExperiment.sln',  # 相对于game_root
+        'project': 'Assembly-CSharp',
+        'activity_list': '',  # 活动模板的列表（JSON）
+        'blacklist': '',  # 文本黑名单：每行一条忽略规则（非文本ID的字符串、前缀、通配符、正则式），见IgnoreRules
+        'scan_workers': 0,  # 扫描文件的进程数。0：每个CPU核心一个进程；1：不使用进程池
+        'scan_chunk_size': 16,  # 每次分配给一个进程的文件个数
+        'insert_batch_size': 10000,  # 扫描结果边产生边写入数据库，每批写入的记录数
+        'cache_dir': r'D:\tools\LingoMan\cache',  # 解析过的Excel缓存在这里。空字符串：不使用缓存
+        'cache_size_limit': 1 << 30,  # 缓存文件夹的大小上限（字节）
+        'asset_extensions': ['.prefab', '.unity', '.asset'],  # 这些Unity资源文件里查找stringLocKey（预制体、场景、ScriptableObject）
+        # 遍历工程目录时，跳过这些文件夹（包括所有子文件夹）：相对于game_root的路径，或者'*/'加文件夹名（任何深度）
+        'excluded_dirs': ['Library', 'Temp', 'Logs', '.git', '.vs'],
+        'export_format': 'xlsx-streaming',  # EXPORT_FORMATS的键
+        'trace_memory': False,  # 记录每个阶段的内存峰值（tracemalloc，会慢很多）
+        'profile_stages': [],  # 用cProfile分析这些阶段（如'asset'、'analyze: pass 1'）。'*'：所有阶段
+        'profile_dir': 'profiles'  # 分析结果<stage>.prof保存在这里
+    }
+
+    def __init__(self, **kw):
+        for key, value in Config.DEFAULTS.items():
+            setattr(self, key, list(value) if isinstance(value, list) else value)
+        self.update(**kw)
+
+    @staticmethod
+    def load(filename):
+        """
+        :param filename: JSON file of settings. Unknown keys are ignored (with a warning).
+        """
+        with open(filename, 'r', encoding='utf-8') as ifs:
+            return Config(**json.load(ifs))
+
+    def update(self, **kw):
+        """
+        :param kw: settings to be overridden. None values are skipped, so unset options keep the old settings.
+        """
+        for key, value in kw.items():
+            if key not in Config.DEFAULTS:
+                print('Unknown setting: %s' % key)
+            elif value is not None:
+                setattr(self, key, value)
+        return self
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in Config.DEFAULTS}
+
+
+class TextAnalyzer:
+    """
+    All steps on text usages of the game:
+      1. scan game project, and record where each text ID is used (in database);
+      2. analyze used text IDs against LOC.xlsx: undefined, unused, possible used, possible spelling mistakes;
+      3. export rows of LOC.xlsx to workbooks of used and unused texts.
+    Results go to console, and are also returned for callers (GUI or command line).
+    Metrics of every stage are recorded (see metrics.MetricsRecorder), and saved with the latest run of database.
+    Coding Example:
+        analyzer = TextAnalyzer(Config.load('lingoman.json'))
+        text_db = analyzer.open_database(create=True)
+        analyzer.read_all_strings_from_xlsx()
+        analyzer.scan_changed(text_db)
+        result = analyzer.analyze()
+        print(analyzer.read_metrics())
+    """
+    SECTIONS_KEY = '<sections of LOC.xlsx>'  # 记录在manifest里，分页变化时必须全部重新扫描
+    CSHARP_KEY = '<C# scanner>'  # 记录在manifest里，换了C#的扫描方式时必须重新扫描代码
+    RULES_KEY = '<ignore rules>'  # 记录在manifest里，忽略规则变化时必须全部重新扫描
+    GAME_DATA_FOLDERS = ['GameDatasNew/Client', 'GameDatasNew/Server', 'GameDatasNew/Share', 'Campaign']
+
+    def __init__(self, config=None):
+        self._config = Config() if config is None else config
+        self._used_strings = None
+        self._all_strings = set()
+        self._strings_index = CaseInsensitiveIndex([])
+        self._database = None
+        self._xlsx_sheets = []
+        self._sections = SectionResolver([])  # 每次读取LOC.xlsx时重建，所有扫描和导出共用
+        self._file_counts = None
+        self._stage_timings = {}
+        self._loc_book = None
+        self._metrics = MetricsRecorder(self._config.trace_memory, self._config.profile_stages,
+                                        self._config.profile_dir)
+        self._pool = None  # scan_changed()运行时，各阶段共用的进程池
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def metrics(self):
+        """
+        :return: MetricsRecorder obj, which holds metrics of stages not saved yet.
+        """
+        return self._metrics
+
+    @property
+    def database(self):
+        return self._database
+
+    @property
+    def used_strings(self):
+        return self._used_strings
+
+    @property
+    def file_counts(self):
+        """
+        :return: collections.Counter {extension: count of files}, of last walk of game root. None before any walk.
+        """
+        return self._file_counts
+
+    @property
+    def stage_timings(self):
+        """
+        :return: dict {stage name: wall time in seconds}, of last scan. See StageScheduler.
+        """
+        return self._stage_timings
+
+    def open_database(self, create=False, clear=False):
+        """
+        :param create: create a new database if it's not found.
+        :param clear: clear data of old database, so all files are scanned next time.
+        :return: TextDataBase obj, which is also used by later steps. None if database is not found, or in wrong format.
+        """
+        path = self._config.database_path
+        if not os.path.exists(path):
+            if not create:
+                print('No database is found: %s' % path)
+                return None
+            text_db = TextDataBase.create_new(path)
+        else:
+            if clear:
+                TextDataBase.clear_database(path)
+            text_db = TextDataBase.open_old(path)
+            if text_db is None:
+                print('Wrong database format: %s' % path)
+                return None
+        self._database = text_db
+        return text_db
+
+    def load_database(self, text_db):
+        """
+        Use usages recorded by last scan, instead of scanning again.
+        :return: count of used text IDs.
+        """
+        with self._metrics.stage('load database') as metrics:
+            self._database = text_db
+            stats = TextStats()
+            rows = 0
+            for tid, location in text_db.iter_all():  # 逐批读取，不必先把所有记录读成列表
+                stats.add_entry(tid, location)
+                rows += 1
+            self._used_strings = stats
+            metrics.count('matches', rows)
+        return len(self._used_strings.text_ids)
+
+    def scan_changed(self, text_db, full=False):
+        """
+        Scan files which are new or changed since last scan, and replace their rows in table <used>.\n
+        All files are scanned if manifest is empty (new database or cleared one).
+        :param text_db: TextDataBase obj.
+        :param full: scan all files, and replace all old rows. Old rows are kept if scan fails.
+        :return: count of changed (or deleted) files.
+        """
+        config = self._config
+        manifest = {} if full else text_db.read_manifest()
+        sections = hashlib.md5(','.join(self._xlsx_sheets).encode('utf-8')).hexdigest()
+        if len(manifest) > 0 and manifest.get(TextAnalyzer.SECTIONS_KEY, (0, 0, None))[2] != sections:
+            # 多语言表的分页变了，所有文件的匹配结果都可能变化，只能全部重新扫描
+            print('Sections of LOC.xlsx are changed. Rebuild database.')
+            manifest = {}  # 旧记录在写入新结果的同一个事务里删除，扫描失败时保持不变
+        # 忽略的文本ID在扫描时就丢弃了，规则变化后（包括删除了规则），只能全部重新扫描
+        rules = self.read_ignore_rules()
+        if len(manifest) > 0 and manifest.get(TextAnalyzer.RULES_KEY, (0, 0, IgnoreRules().digest()))[2] != rules.digest():
+            print('Ignore rules are changed. Rebuild database.')
+            manifest = {}
+        #
+        files = {}
+        activity_list = os.path.abspath(config.activity_list) if len(config.activity_list) > 0 else None
+        if activity_list is not None and os.path.exists(activity_list):
+            files[activity_list] = activity_list
+        prefabs, sources, workbooks = self.walk_game_root()
+        solution = config.solution
+        solution_file = os.path.join(config.game_root, solution)
+        if self.use_roslyn() and os.path.exists(solution_file):
+            sources[solution] = solution_file
+        files.update(prefabs)
+        files.update(sources)
+        files.update({path: full_file_name for path, (_, full_file_name) in workbooks.items()})
+        #
+        with self._metrics.stage('manifest') as metrics:
+            changed, deleted, fingerprints = check_manifest(manifest, files)
+            deleted.discard(TextAnalyzer.SECTIONS_KEY)
+            deleted.discard(TextAnalyzer.CSHARP_KEY)
+            deleted.discard(TextAnalyzer.RULES_KEY)
+            metrics.count('files', len(files))
+            metrics.count('matches', len(changed) + len(deleted))
+        csharp = 'roslyn' if self.use_roslyn() else 'builtin'
+        csharp_changed = len(manifest) > 0 and manifest.get(TextAnalyzer.CSHARP_KEY, (0, 0, 'roslyn'))[2] != csharp
+        # 各阶段互不依赖，同时运行：等待外部程序（C#）的时间里，Python这边的扫描可以继续
+        # 每个阶段都是生成器，产生一个个(源文件, 该文件的扫描结果)
+        scheduler = StageScheduler()
+        rescanned = []  # 重新扫描的源文件，它们原有的记录都要删除
+        if activity_list in changed:
+            scheduler.add('activity list', lambda: [(activity_list, self.scan_activity_list(rules))])
+            rescanned.append(activity_list)
+        # 代码是整个工程一起扫描的，只要有一个文件变化，就得重新扫描
+        code_changed = len(set(sources.keys()) & changed) > 0 or any(i.endswith('.cs') for i in deleted)
+        if csharp_changed or code_changed:
+            scheduler.add('solution', lambda: ((solution, texts) for texts in self.iter_solution(sources, rules)))
+            rescanned.append(solution)
+        changed_prefabs = {i: files[i] for i in changed if i in prefabs}
+        if len(changed_prefabs) > 0:
+            scheduler.add('asset', self.iter_stage, 'asset', scan_prefab_file, changed_prefabs, self._sections, rules)
+            rescanned.extend(changed_prefabs.keys())
+        changed_workbooks = {i: workbooks[i] for i in changed if i in workbooks}
+        if len(changed_workbooks) > 0:
+            scheduler.add('game data', self.iter_stage, 'game data', scan_game_data_file, changed_workbooks,
+                          self._sections, self.workbook_cache(), rules)
+            rescanned.extend(changed_workbooks.keys())
+        #
+        def stream_rows():
+            for _, (src, texts) in scheduler.stream():  # 先产生的先写入
+                for tid, location in texts:
+                    yield tid, location, src
+
+        with self.shared_pool(), self._metrics.stage('database') as metrics:
+            # 扫描结果边产生边分批写入，全部在一个事务里：内存里只有正在写入的一批
+            rows = stream_rows()
+            # manifest为空时是全部重新扫描：旧记录全部删除，包括升级前没有记录源文件的那些
+            written = text_db.replace_sources_streaming(rescanned, rows, deleted, config.insert_batch_size,
+                                                        clear=len(manifest) == 0)
+            rows.close()
+            self._stage_timings = scheduler.timings
+            if written < 0:
+                raise RuntimeError('Error on saving scan results. Database is not changed.')
+            metrics.count('matches', written)
+            text_db.update_unused([])  # 依赖于旧的扫描结果，已经过时了
+            fingerprints[TextAnalyzer.SECTIONS_KEY] = (0, 0, sections)
+            fingerprints[TextAnalyzer.CSHARP_KEY] = (0, 0, csharp)
+            fingerprints[TextAnalyzer.RULES_KEY] = (0, 0, rules.digest())
+            text_db.update_manifest(fingerprints, deleted)
+            run_id = text_db.record_run(config.game_root, read_revision(config.game_root))
+        #
+        self._database = text_db
+        self.load_database(text_db)
+        self.save_metrics(run_id)
+        return len(changed) + len(deleted)
+
+    def scan_engine(self):
+        """
+        :return: new ScanEngine obj. It uses the shared pool while scan_changed() is running stages at the same time.
+        """
+        return ScanEngine(self._config.scan_workers, self._config.scan_chunk_size, self._pool, self.encoding_cache())
+
+    @contextlib.contextmanager
+    def shared_pool(self):
+        """
+        One process pool for all concurrent stages: scan_workers are shared, instead of a pool of that size per stage.
+        """
+        if ScanEngine.worker_count(self._config.scan_workers) == 1:
+            yield None
+            return
+        self._pool = ScanEngine.create_pool(self._config.scan_workers)
+        try:
+            yield self._pool
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def iter_stage(self, name, func, tasks, *args):
+        """
+        Run a file-level scanner as a stage, with its own ScanEngine (so counters of concurrent stages aren't mixed).
+        :param func: file-level scanner, such as scan_prefab_file.
+        :param tasks: dict {path relative to game root: task of func}
+        :return: generator of tuple(path, set of tuple(text_id, location)), in order of paths.
+        """
+        with self._metrics.stage(name) as metrics:
+            engine = self.scan_engine()
+            paths = sorted(tasks.keys())
+            yield from zip(paths, engine.imap(func, [tasks[i] for i in paths], *args))
+            metrics.merge(engine)
+
+    def save_metrics(self, run_id=None):
+        """
+        Save metrics of stages recorded since last save, to a run of database.
+        :param run_id: the latest run if None. Metrics are dropped if there's no run (or no database).
+        :return: list of dict of metrics. See StageMetrics.as_dict().
+        """
+        stages = [i.as_dict() for i in self._metrics.flush()]
+        if self._database is None or len(stages) == 0:
+            return stages
+        if run_id is None:
+            runs = self._database.read_runs()
+            if len(runs) == 0:
+                return stages
+            run_id = runs[-1][0]
+        if run_id >= 0:
+            self._database.record_metrics(run_id, stages)
+        return stages
+
+    def read_metrics(self, run_id=None):
+        """
+        :param run_id: the latest run if None.
+        :return: dict {'run': {'id', 'time', 'game_root', 'revision', 'usages'}, 'stages': list of dict of metrics}.
+            None if there's no such run.
+        """
+        runs = self._database.read_runs()
+        if run_id is not None:
+            runs = [i for i in runs if i[0] == run_id]
+        if len(runs) == 0:
+            return None
+        run = dict(zip(('id', 'time', 'game_root', 'revision', 'usages'), runs[-1]))
+        return {'run': run, 'stages': self._database.read_metrics(run['id'])}
+
+    def read_ignore_rules(self):
+        """
+        :return: IgnoreRules of the blacklist file (Config.blacklist). No rule if it's not set, or not found.
+        """
+        blacklist_path = self._config.blacklist.strip()
+        if len(blacklist_path) == 0 or not os.path.exists(blacklist_path):
+            return IgnoreRules()
+        content = try_read_text_file(blacklist_path)
+        if content is None:
+            print('Unknown encoding: ' + blacklist_path)
+            return IgnoreRules()
+        return IgnoreRules(content.split('\n'))
+
+    def diff_last_runs(self):
+        """
+        Compare the last two scan runs of database.
+        :return: tuple(old run, new run, added, removed, changed). See TextDataBase.diff_runs(). None if less than two runs.
+        """
+        runs = self._database.read_runs()
+        if len(runs) < 2:
+            return None
+        old, new = runs[-2], runs[-1]
+        added, removed, changed = self._database.diff_runs(old[0], new[0])
+        print('--- run %d (%s, %s) -> run %d (%s, %s)' % (old[0], old[1], old[3], new[0], new[1], new[3]))
+        print('--- newly used text IDs:')
+        for each in sorted(added.keys()):
+            print(each)
+            for location in added[each]:
+                print('\t+ %s' % location)
+        print('--- text IDs which become unused:')
+        for each in sorted(removed.keys()):
+            print(each)
+            for location in removed[each]:
+                print('\t- %s' % location)
+        print('--- text IDs whose locations are changed:')
+        for each in sorted(changed.keys()):
+            print(each)
+            for location in changed[each][0]:
+                print('\t+ %s' % location)
+            for location in changed[each][1]:
+                print('\t- %s' % location)
+        return old, new, added, removed, changed
+
+    def read_all_strings_from_xlsx(self):
+        with self._metrics.stage('LOC.xlsx') as metrics:
+            book = self.loc_book()
+            self._xlsx_sheets = book.sheets
+            self._sections = SectionResolver(self._xlsx_sheets)
+            self._all_strings = set(book.text_ids())
+            self._strings_index = CaseInsensitiveIndex(self._all_strings)
+            metrics.count('files')
+            if os.path.exists(book.filename):
+                metrics.count('bytes', os.path.getsize(book.filename))
+            metrics.count('cells', len(self._all_strings))
+
+    def loc_book(self):
+        """
+        :return: LocBook of LOC.xlsx. It's parsed only once per session (unless changed), and cached on disk.
+        """
+        config = self._config
+        workbook = os.path.join(config.game_root, 'Assets', 'Text', 'LOC.xlsx')
+        if self._loc_book is None or self._loc_book.filename != workbook:
+            cache = None if len(config.cache_dir) == 0 else FileCache(config.cache_dir, config.cache_size_limit,
+                                                                      tag='loc-sheets')
+            self._loc_book = LocBook(workbook, cache)
+        return self._loc_book
+
+    def analyze(self):
+        """
+        Compare used text IDs with those defined in LOC.xlsx. Unused text IDs are saved in database.
+        :return: dict {
+            'templates': {interpolated string: set of text IDs},
+            'possible_used': {undefined text ID: set of text IDs containing it},
+            'misspelled': {undefined text ID: set of text IDs containing it if case is ignored},
+            'undefined': {text ID: list of locations},
+            'unused': set of text IDs
+        }
+        """
+        with self._metrics.stage('analyze') as analysis:
+            # 1. 第一次，粗筛
+            with self._metrics.stage('analyze: pass 1') as metrics:
+                id_used = set(self._used_strings.text_ids)
+                undefined = id_used - self._all_strings  # 虽然是“使用”状态，但并未在LOC.xlsx中定义
+                unused = self._all_strings - id_used  # 找不到引用之处
+                metrics.count('cells', len(id_used) + len(self._all_strings))
+                metrics.count('matches', len(undefined) + len(unused))
+            # 2. 第二次，组合式的文本；3. 第三次，大小写拼写错误。
+            # 两次共用一个忽略大小写的索引，每个ID只查询一次，再按是否区分大小写分成两类结果。
+            # 搜索C#的Interpolated String，形如：$"LC_COMMON_{agentName}"。所有模板一起，只遍历一遍文本ID
+            with self._metrics.stage('analyze: templates') as metrics:
+                templates = TemplateMatcher(undefined, casefold=True)
+                templates_exact, templates_folded = templates.match_all_cases(self._all_strings)
+                metrics.count('cells', len(self._all_strings))
+                metrics.count('matches', len(templates_folded))
+            TextAnalyzer.print_templates(templates_exact)
+            with self._metrics.stage('analyze: pass 2-3') as metrics:
+                possible_used_dict = {}  # 区分大小写时能匹配上的
+                misspelled_dict = {}  # 只有忽略大小写时才能匹配上的
+                for each in undefined:
+                    exact, folded = self._strings_index.find(each)
+                    exact |= templates_exact.get(each, set())
+                    if len(exact) > 0:
+                        possible_used_dict[each] = exact
+                        continue
+                    folded |= templates_folded.get(each, set())
+                    if len(folded) > 0:
+                        misspelled_dict[each] = folded
+                metrics.count('cells', len(undefined))
+                metrics.count('matches', len(possible_used_dict) + len(misspelled_dict))
+            print('--- possible used:')
+            for each, possible_used in possible_used_dict.items():
+                print(each)                  # 1. 可以认为该项是“已经定义”（在多语言文本里）
+                for i in possible_used:      # 2. 所有相关的匹配项都认为是“被使用”状态
+                    print('\t' + i)
+                unused = unused - possible_used  # 汇总
+            print('--- possible spelling mistake:')
+            for each, possible_used in misspelled_dict.items():
+                print(each)
+                locations = self._used_strings.locations(each)
+                for location in locations:
+                    print('\t' + location)
+                for i in possible_used:
+                    print('\t' + i)
+                unused = unused - possible_used  # 汇总
+            undefined = undefined - set(possible_used_dict.keys()) - set(misspelled_dict.keys())
+            # 1/2. 输出最后结果：未找到定义
+            if len(undefined) > 0:
+                print('--- undefined text IDs:')
+                for each in undefined:
+                    print(each)
+                    locations = self._used_strings.locations(each)
+                    for location in locations:
+                        print('\t' + location)
+            # 2/2. 输出最后结果：未找到引用
+            if len(unused) > 0:
+                print('--- unused text IDs:')
+                for each in unused:
+                    print(each)
+                self._database.update_unused(unused)
+            analysis.count('cells', len(id_used))
+            analysis.count('matches', len(undefined) + len(unused))
+        self.save_metrics()
+        return {
+            'templates': templates_exact,
+            'possible_used': possible_used_dict,
+            'misspelled': misspelled_dict,
+            'undefined': {each: self._used_strings.locations(each) for each in undefined},
+            'unused': unused
+        }
+
+    @staticmethod
+    def print_templates(templates):
+        """
+        :param templates: dict {template: set of matched text IDs}
+        """
+        if len(templates) == 0:
+            return
+        print('--- interpolated strings:')
+        for template in sorted(templates.keys()):
+            print(template)
+            for i in sorted(templates[template]):
+                print('\t' + i)
+
+    def update_unused_manually(self, filename):
+        """
+        Append text IDs (found by people, one per line) to table <unused>. Those recorded as used are skipped.
+        :return: list of appended text IDs.
+        """
+        id_list = try_read_text_file(filename)
+        id_list = id_list.split('\n')
+        id_list = set(i.strip() for i in id_list if len(i.strip()) > 0)
+        used = self._database.filter_used(id_list)
+        id_list = [i for i in id_list if i not in used]
+        self._database.append_unused(id_list)
+        return id_list
+
+    def double_check(self, output='double_check.txt'):
+        """
+        Search all unused text IDs in C# source files again, to find texts which may be referenced after all.\n
+        Hits are grouped by file and written to output file.
+        :return: dict {path relative to game root: list of text IDs found in it}. None if table <unused> is empty.
+        """
+        unused = self._database.read_all_unused()
+        if len(unused) == 0:
+            return None
+        #
+        unused = tuple(sorted(set(unused)))  # 所有文本ID只创建一个匹配器，每个文件只扫描一遍
+        sources = self.walk_game_root()[1]  # 只检查C#源码文件
+        paths = sorted(sources.keys())
+        with self._metrics.stage('double check') as metrics:
+            engine = self.scan_engine()
+            results = engine.map(search_source_file, [sources[i] for i in paths], unused)
+            metrics.merge(engine)
+        self.save_metrics()
+        print('\n--- possible referenced places:')
+        hits = {}
+        with open(output, 'w', encoding='utf-8') as ofs:
+            for path, found in zip(paths, results):
+                if found is None:
+                    print('Unknown encoding: ' + sources[path])
+                    continue
+                if len(found) == 0:
+                    continue
+                hits[path] = found
+                print(path)
+                ofs.write(path + '\n')
+                for each in found:
+                    print('\t' + each)
+                    ofs.write('\t' + each + '\n')
+        return hits
+
+    def scan_prefab(self, prefabs=None, rules=None):
+        """
+        Scan all text IDs in Unity asset files (prefabs, scenes, ScriptableObjects).
+        :param prefabs: full file names. All asset files under game root if None.
+        :param rules: IgnoreRules obj. Those of the blacklist file if None.
+        """
+        if prefabs is None:
+            prefabs = self.walk_game_root()[0].values()
+        rules = self.read_ignore_rules() if rules is None else rules
+        with self._metrics.stage('asset') as metrics:
+            engine = self.scan_engine()
+            strings = engine.union(scan_prefab_file, sorted(prefabs), self._sections, rules)
+            metrics.merge(engine)
+        return strings
+
+    def scan_game_data(self, workbooks=None, rules=None):
+        """
+        :param workbooks: sequence of tuple(data folder, full file name). All data workbooks if None.
+        :param rules: IgnoreRules obj. Those of the blacklist file if None.
+        """
+        if workbooks is None:
+            workbooks = self.walk_game_root()[2].values()
+        rules = self.read_ignore_rules() if rules is None else rules
+        with self._metrics.stage('game data') as metrics:
+            engine = self.scan_engine()
+            strings = engine.union(scan_game_data_file, sorted(workbooks), self._sections, self.workbook_cache(),
+                                   rules)
+            metrics.merge(engine)
+        return strings
+
+    def workbook_cache(self):
+        """
+        :return: FileCache of string cells in data workbooks. None if cache is disabled.
+        """
+        if len(self._config.cache_dir) == 0:
+            return None
+        return FileCache(self._config.cache_dir, self._config.cache_size_limit, tag='string-cells')
+
+    def source_cache(self):
+        """
+        :return: FileCache of string literals in C# source files. None if cache is disabled.
+        """
+        if len(self._config.cache_dir) == 0:
+            return None
+        return FileCache(self._config.cache_dir, self._config.cache_size_limit, tag='cs-literals')
+
+    def encoding_cache(self):
+        """
+        :return: EncodingCache of text files decoded by scanners. None if cache is disabled.
+        """
+        if len(self._config.cache_dir) == 0:
+            return None
+        return EncodingCache(self._config.cache_dir)
+
+    def walk_game_root(self):
+        """
+        Visit game root only once, and collect files for all scanners.
+        :return: tuple(Unity assets, C# sources, data workbooks). Each is a dict, whose key is path relative to game root.
+            Unity assets are files of Config.asset_extensions, such as prefabs.
+            Value is full file name, or tuple(data folder, full file name) for data workbooks.
+        """
+        game_root = self._config.game_root
+        prefabs, sources, workbooks = {}, {}, {}
+        data_root = os.path.join(game_root, 'config')
+
+        def add_workbook(entry):
+            each_dir = os.path.relpath(os.path.dirname(entry.path), data_root).replace('\\', '/')
+            if each_dir in TextAnalyzer.GAME_DATA_FOLDERS:
+                workbooks[os.path.relpath(entry.path, game_root)] = (each_dir, entry.path)
+
+        with self._metrics.stage('walk') as metrics:
+            walker = TreeWalker(game_root, self._config.excluded_dirs)
+            walker.register(self._config.asset_extensions, lambda entry: prefabs.setdefault(os.path.relpath(entry.path, game_root), entry.path))
+            walker.register(['.cs'], lambda entry: sources.setdefault(os.path.relpath(entry.path, game_root), entry.path))
+            walker.register(['.xls'], add_workbook)
+            walker.walk()
+            metrics.count('files', sum(walker.counts.values()))
+            metrics.count('matches', len(prefabs) + len(sources) + len(workbooks))
+        self._file_counts = walker.counts
+        print('Files visited: %d (%s, .cs: %d, .xls: %d)' % (sum(walker.counts.values()),
+              ', '.join('%s: %d' % (i, walker.counts[i]) for i in self._config.asset_extensions),
+              walker.counts['.cs'], walker.counts['.xls']))
+        return prefabs, sources, workbooks
+
+    def use_roslyn(self):
+        """
+        :return: True if C# code is scanned by the external tool (roslyn_finder), False by the built-in lexer.
+        """
+        return self._config.csharp_scanner == 'roslyn' and len(self._config.roslyn_finder) > 0
+
+    def scan_solution(self, sources=None, rules=None):
+        """
+        Scan all text IDs in C# code, by the external tool or the built-in lexer (see use_roslyn()).
+        :param sources: dict {path relative to game root: full file name} of C# source files. All under game root if None.
+            Only used by the built-in lexer.
+        :param rules: IgnoreRules obj. Those of the blacklist file if None.
+        :return: set of tuple(text_id, location). Empty if the external tool can't run, or fails.
+        """
+        strings = set()
+        try:
+            for texts in self.iter_solution(sources, rules):
+                strings.update(texts)
+        except RuntimeError as e:
+            print(e)
+            return set()
+        return strings
+
+    def iter_solution(self, sources=None, rules=None):
+        """
+        Like scan_solution(), but usages are yielded while they're found:
+        per source file by the built-in lexer, per batch of output lines by the external tool.
+        :return: generator of collections of tuple(text_id, location).
+            RuntimeError is raised if the external tool can't run or fails (after some usages may be yielded).
+        """
+        if not self.use_roslyn() and sources is None:
+            sources = self.walk_game_root()[1]
+        rules = self.read_ignore_rules() if rules is None else rules
+        with self._metrics.stage('solution') as metrics:
+            if self.use_roslyn():
+                for texts in self.iter_solution_roslyn(metrics, rules):
+                    metrics.count('matches', len(texts))
+                    yield texts
+                return
+            files = sorted(v for k, v in sources.items() if k.endswith('.cs'))
+            engine = self.scan_engine()
+            yield from engine.imap(scan_csharp_file, files, self._sections, self.source_cache(), rules)
+            metrics.merge(engine)
+
+    def iter_solution_roslyn(self, metrics, rules=None, batch_size=1000):
+        """
+        :param metrics: StageMetrics obj, to count output lines of the external tool (as cells) and errors.
+        :param rules: IgnoreRules obj, matched with location printed by the tool as path. No rule if None.
+        :param batch_size: max count of usages in each yielded list.
+        :return: generator of lists of tuple(text_id, location), yielded while the external tool is printing them.
+            RuntimeError is raised if the tool can't run, or fails.
+        """
+        config = self._config
+        sections = ','.join(self._xlsx_sheets)
+        solution = os.path.join(config.game_root, config.solution)
+        rules = IgnoreRules.of(rules)
+        batch = []
+        others = []  # 不是结果的输出（出错时打印出来）
+        regex = re.compile(r'TEXT:\s+(.+),(.+)')
+        try:
+            # 逐行读取输出，不必等程序结束后一次性读入内存
+            with subprocess.Popen([config.roslyn_finder, solution, config.project, sections], stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, encoding='gbk', errors='replace') as proc:
+                for line in proc.stdout:
+                    metrics.count('cells')
+                    result = regex.match(line.rstrip('\r\n'))
+                    if result is None:
+                        others.append(line)
+                        continue
+                    tid, location = result.group(1), result.group(2)
+                    ignored = rules.matcher('solution', location)
+                    if ignored is not None and ignored(tid):
+                        metrics.count('ignored')
+                        continue
+                    batch.append((tid, location))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        except OSError as e:  # 找不到程序，或者在当前系统上不能运行
+            metrics.count('errors')
+            raise RuntimeError('Error on collecting symbols: %s' % e)
+        if proc.returncode != 0:
+            metrics.count('errors')
+            raise RuntimeError('Error on collecting symbols: %s' % ''.join(others))
+        if len(batch) > 0:
+            yield batch
+
+    def scan_activity_list(self, rules=None):
+        """
+        :param rules: IgnoreRules obj. Those of the blacklist file if None.
+        """
+        rules = self.read_ignore_rules() if rules is None else rules
+        with self._metrics.stage('activity list') as metrics:
+            strings = self.read_activity_list(metrics, rules)
+            metrics.count('matches', len(strings))
+        return strings
+
+    def read_activity_list(self, metrics, rules):
+        filename = self._config.activity_list
+        if not os.path.exists(filename):
+            return set()
+        metrics.count('files')
+        metrics.count('bytes', os.path.getsize(filename))
+        strings = set()
+        ignored = rules.matcher('activity list', os.path.abspath(filename))
+
+        def add(text_id, location):
+            if ignored is not None and ignored(text_id):
+                metrics.count('ignored')
+            else:
+                strings.add((text_id, location))
+
+        try:
+            template_file = try_read_text_file(filename)
+            templates = json.loads(template_file)
+            if templates["type"] != "rule_aty":
+                return set()
+            for activity in templates["data"]:
+                metrics.count('cells')
+                identity = activity["Id"]
+                # 1/5
+                title = activity["Title"]
+                if len(title) > 0:
+                    add(title, 'activity: %s, title' % identity)
+                # 2/5
+                icon_title = activity["IconTitle"]
+                if len(icon_title) > 0:
+                    add(icon_title, 'activity: %s, icon-title' % identity)
+                # 3/5
+                description_full = activity["Desc"]
+                if len(description_full) > 0:
+                    add(description_full, 'activity: %s, description_full' % identity)
+                # 4/5
+                description_short = activity["ShortDesc"]
+                if len(description_short) > 0:
+                    add(description_short, 'activity: %s, description_short' % identity)
+                # 5/5
+                rule = activity["Rule"]
+                if len(rule) > 0:
+                    add(rule, 'activity: %s, rule' % identity)
+        except Exception as e:
+            print(e)
+            metrics.count('errors')
+        finally:
+            return strings
+
+    def dump_result(self, unused=None, fmt=None):
+        rules = [
+            ('unused.xlsx', select_unused),
+            ('used.xlsx', select_all)
+        ]
+        return self.export(rules, unused, fmt)
+
+    def dump_result_arabic(self, unused=None, fmt=None):
+        rules = [
+            ('unused.xlsx', select_unused),
+            ('used_untranslated.xlsx', select_untranslated('ar', u'[\u0600-\u06ff]+')),  # 没有阿拉伯文的（全是英文，或者是空白），放到另外一边
+            ('used.xlsx', select_all)
+        ]
+        return self.export(rules, unused, fmt)
+
+    def export(self, rules, unused=None, fmt=None):
+        """
+        :param rules: list of tuple(output file name, select function). See ExportEngine.
+        :param unused: collection of unused text IDs. Read from database if None.
+        :param fmt: key of EXPORT_FORMATS. Config.export_format if None.
+        :return: list of paths really written. For 'csv' and 'parquet' formats, they're folders. See ExportEngine.
+        """
+        if unused is None:
+            unused = self._database.read_all_unused()
+        #
+        # 为加快速度，把文本ID拆分成多个集合
+        unused_dict = {}
+        for i in self._xlsx_sheets:
+            unused_dict[i] = set()
+        for each_text in unused:
+            resolved = self._sections.resolve(each_text)
+            if resolved is not None:
+                section, tid = resolved
+                unused_dict[section].add(tid)
+        # 遍历源Excel，最后结果一次性输出到各个文件里
+        fmt = self._config.export_format if fmt is None else fmt
+        with self._metrics.stage('export') as metrics:
+            outputs = ExportEngine(rules).export(self.loc_book().frames(), unused_dict, fmt)
+            metrics.count('files', len(rules))
+            metrics.count('matches', len(unused))
+        self.save_metrics()
+        return outputs
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Extract string literals from C# source code, without Roslyn.
+Regular ("..."), verbatim (@"...") and interpolated ($"...", $@"...", @$"...") strings are recognized.
+Comments and char literals are skipped, so quotes in them don't start a string.
+Holes of interpolated strings are kept as they're written (such as LC_COMMON_{agentName}),
+so they can be matched as templates later (see matcher.TemplateMatcher).
+"""
+import re
+
+# 代码里只关心这几种记号：注释、字符、字符串的开头。其他代码一次跳过
+_TOKEN = re.compile(r'//[^\n]*|/\*.*?\*/|\'(?:\\.|[^\'\\\n])*\'|(?P<string>(?:\$@|@\$|\$|@)?")', re.S)
+_REGULAR = re.compile(r'(?:[^"\\\n]|\\.)*"')
+_VERBATIM = re.compile(r'(?:[^"]|"")*"')
+_INTERPOLATED = re.compile(r'{{|}}|{|}|"|\\.|[^{}"\\\n]+', re.S)
+_INTERPOLATED_VERBATIM = re.compile(r'{{|}}|{|}|""|"|[^{}"]+')
+# 插值表达式里，还可能嵌套字符串、字符、大括号
+_HOLE = re.compile(r'[^{}"\'/@$]+|{|}|//[^\n]*|/\*.*?\*/|\'(?:\\.|[^\'\\\n])*\'|(?P<string>(?:\$@|@\$|\$|@)?")|.', re.S)
+_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|x[0-9a-fA-F]{1,4}|.)', re.S)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', 'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v'}
+
+
+def _unescape(text):
+    if '\\' not in text:
+        return text
+
+    def replace(result):
+        code = result.group(1)
+        if len(code) > 1:  # \uXXXX, \UXXXXXXXX, \xX..
+            return chr(int(code[1:], 16))
+        return _ESCAPES.get(code, code)
+    return _ESCAPE.sub(replace, text)
+
+
+def _skip_hole(source, pos, nested):
+    """
+    :param pos: position after '{' of a hole.
+    :param nested: list to collect tuple(start position, value) of strings in the hole, such as $"{Get("LC_UI_ok")}"
+    :return: position after the matching '}'. None if source ends before it.
+    """
+    depth = 1
+    while pos < len(source):
+        result = _HOLE.match(source, pos)
+        token = result.group()
+        pos = result.end()
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                return pos
+        elif result.group('string') is not None:
+            value, pos = _read_string(source, pos, token[:-1], nested)
+            if value is not None:
+                nested.append((result.start(), value))
+    return None
+
+
+def _read_interpolated(source, pos, verbatim, nested):
+    regex = _INTERPOLATED_VERBATIM if verbatim else _INTERPOLATED
+    parts = []
+    while True:
+        result = regex.match(source, pos)
+        if result is None:  # 换行，或者文件结束
+            return None, pos
+        token = result.group()
+        pos = result.end()
+        if token == '"':
+            return ''.join(parts), pos
+        if token == '{{':
+            parts.append('{')
+        elif token == '}}':
+            parts.append('}')
+        elif token == '""':
+            parts.append('"')
+        elif token == '{':
+            end = _skip_hole(source, pos, nested)
+            if end is None:
+                return None, pos
+            parts.append(source[pos - 1:end])
+            pos = end
+        elif token.startswith('\\'):
+            parts.append(_unescape(token))
+        else:
+            parts.append(token)
+
+
+def _read_string(source, pos, prefix, nested):
+    """
+    :param pos: position after the opening quote.
+    :param prefix: '', '@', '$', '$@' or '@$'
+    :param nested: list to collect strings in holes of interpolated string. See _skip_hole().
+    :return: tuple(value of string, position after the closing quote). Value is None if string isn't terminated.
+    """
+    if '$' in prefix:
+        return _read_interpolated(source, pos, '@' in prefix, nested)
+    if prefix == '@':
+        result = _VERBATIM.match(source, pos)
+        if result is None:
+            return None, pos
+        return result.group()[:-1].replace('""', '"'), result.end()
+    result = _REGULAR.match(source, pos)
+    if result is None:
+        return None, pos
+    return _unescape(result.group()[:-1]), result.end()
+
+
+def iter_string_literals(source):
+    """
+    :param source: C# source code.
+    :return: generator of tuple(line number, value) of every string literal, in order.
+    """
+    pos = 0
+    line, counted = 1, 0
+    while True:
+        result = _TOKEN.search(source, pos)
+        if result is None:
+            return
+        prefix = result.group('string')
+        if prefix is None:  # 注释或者字符
+            pos = result.end()
+            continue
+        nested = []
+        value, end = _read_string(source, result.end(), prefix[:-1], nested)
+        if value is None:
+            pos = result.end()
+            continue
+        nested.sort()  # 内层字符串先读完，按位置排在外层之后
+        for start, each in [(result.start(), value)] + nested:
+            line += source.count('\n', counted, start)
+            counted = start
+            yield line, each
+        pos = end
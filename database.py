@@ -0,0 +1,601 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+SQLite database of text usages (used, unused, manifest of scanned files, history of scan runs and their metrics).
+"""
+import sqlite3
+import sys
+import array
+import datetime
+import itertools
+import json
+
+
+class TextStats:
+    """
+    Locations of all used text IDs. Each location string is kept only once, and referenced by its index.
+    """
+    __slots__ = ('_locations', '_names', '_codes')
+
+    def __init__(self):
+        self._locations = {}  # {text_id: array of location indexes}
+        self._names = []  # all different locations
+        self._codes = {}  # {location: index in self._names}
+
+    def add_entry(self, text_id, location):
+        code = self._codes.get(location)
+        if code is None:
+            code = self._codes[location] = len(self._names)
+            self._names.append(location)
+        codes = self._locations.get(text_id)
+        if codes is None:
+            self._locations[sys.intern(text_id)] = array.array('I', (code,))
+        else:
+            codes.append(code)
+
+    @property
+    def text_ids(self):
+        return self._locations.keys()
+
+    def locations(self, text_id):
+        if text_id not in self._locations:
+            return None
+        return [self._names[i] for i in self._locations[text_id]]
+
+    def __contains__(self, text_id):
+        return text_id in self._locations
+
+
+class TextDataBase:
+    SCHEMA_VERSION = 8  # 保存在 PRAGMA user_version 里
+    METRIC_COLUMNS = ('wall', 'cpu', 'peak_memory', 'files', 'bytes', 'cells', 'matches', 'errors', 'ignored',
+                      'encoding_hits', 'encoding_fallbacks', 'encodings')  # encodings：JSON
+    # 插入一行<used>：文本ID、位置、源文件都先登记在各自的表里，<used>只保存它们的整数键
+    SQL_INSERT_USED = '''INSERT OR IGNORE INTO used (tid_id, loc_id, src_id) VALUES(
+        (SELECT id FROM texts WHERE tid=?),
+        (SELECT id FROM locations WHERE loc=?),
+        (SELECT id FROM sources WHERE src=?))'''
+
+    def __init__(self, filename, connection=None):
+        self._filename = filename
+        self._con = sqlite3.connect(filename) if connection is None else connection
+        TextDataBase.tune(self._con)
+
+    def iter_all(self, batch_size=10000):
+        """
+        :param batch_size: count of rows fetched at once.
+        :return: generator of tuple(text_id, location) of all usages. Rows are never all in memory.
+        """
+        cur = self._con.cursor()
+        sql = '''SELECT t.tid, l.loc FROM used u
+            JOIN texts t ON t.id = u.tid_id
+            LEFT JOIN locations l ON l.id = u.loc_id'''
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if len(rows) == 0:
+                return
+            yield from rows
+
+    def insert_batch(self, texts):
+        """
+        :param texts: sequence of tuple(text_id, location)
+        """
+        try:
+            rows = [(tid, loc, None) for tid, loc in texts]
+            cur = self._con.cursor()
+            TextDataBase.register(cur, rows)
+            cur.executemany(TextDataBase.SQL_INSERT_USED, rows)
+            self._con.commit()
+        except Exception as e:
+            print('Error on insertion (batch): %s' % e)
+
+    def replace_sources_streaming(self, sources, rows, removed=(), batch_size=10000, clear=False):
+        """
+        Replace rows of given source files in one transaction. New rows are inserted batch by batch
+        while they're produced (such as by a generator of scan results), so they're never all in memory.
+
+        :param sources: sources which are scanned again. All their old rows are deleted first.
+        :param rows: iterable of tuple(text_id, location, source). Duplicates are ignored (see migrate_to_v6()).
+        :param removed: sources which don't exist any more. All their rows are deleted.
+        :param batch_size: count of rows inserted at once.
+        :param clear: delete all old rows and manifest first, for a full rebuild. Including rows without source
+            (written before sources were recorded, see migrate_to_v1()), which can't be replaced by source.
+        :return: count of inserted rows. -1 when error occurs, and nothing is changed.
+        """
+        try:
+            cur = self._con.cursor()
+            if clear:
+                cur.execute('DELETE FROM used')
+                cur.execute('DELETE FROM manifest')
+            else:
+                sources = [(i,) for i in set(sources) | set(removed)]
+                cur.executemany('DELETE FROM used WHERE src_id IN (SELECT id FROM sources WHERE src=?)', sources)
+            rows = iter(rows)
+            count = 0
+            for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+                TextDataBase.register(cur, batch)
+                cur.executemany(TextDataBase.SQL_INSERT_USED, batch)
+                count += cur.rowcount
+            self._con.commit()
+            return count
+        except Exception as e:
+            self._con.rollback()
+            print('Error on replacement of sources: %s' % e)
+            return -1
+
+    def read_manifest(self):
+        """
+        :return: dict {path: (size, mtime, hash)} of files scanned last time.
+        """
+        try:
+            cur = self._con.cursor()
+            cur.execute('SELECT path, size, mtime, hash FROM manifest')
+            return {p: (s, m, h) for p, s, m, h in cur.fetchall()}
+        except Exception as e:
+            print('Error on reading manifest: %s' % e)
+            return {}
+
+    def update_manifest(self, fingerprints, removed=()):
+        """
+        :param fingerprints: dict {path: (size, mtime, hash)}
+        :param removed: paths which don't exist any more.
+        """
+        try:
+            cur = self._con.cursor()
+            cur.executemany('DELETE FROM manifest WHERE path=?', [(i,) for i in removed])
+            sql = 'INSERT OR REPLACE INTO manifest (path, size, mtime, hash) VALUES(?,?,?,?)'
+            cur.executemany(sql, [(p, s, m, h) for p, (s, m, h) in fingerprints.items()])
+            self._con.commit()
+        except Exception as e:
+            print('Error on update of manifest: %s' % e)
+
+    def read_all_unused(self):
+        try:
+            cur = self._con.cursor()
+            cur.execute('SELECT tid FROM unused')
+            return [t[0] for t in cur.fetchall()]
+        except Exception as e:
+            print('Error on reading: %s' % e)
+            return None
+
+    def update_unused(self, text_ids):
+        """
+        :param text_ids: sequence of text_id
+        """
+        try:
+            cur = self._con.cursor()
+            cur.execute('DELETE FROM unused')  # delete all old rows
+
+            sql = 'INSERT INTO unused (tid) VALUES(?)'
+            args = [(i,) for i in text_ids]
+            cur.executemany(sql, args)
+            self._con.commit()
+        except Exception as e:
+            print('Error on insertion of unused texts: %s' % e)
+
+    def append_unused(self, text_ids):
+        """
+        :param text_ids: sequence of text_id
+        """
+        try:
+            cur = self._con.cursor()
+            sql = 'INSERT INTO unused (tid) VALUES(?)'
+            args = [(i,) for i in text_ids]
+            cur.executemany(sql, args)
+            self._con.commit()
+        except Exception as e:
+            print('Error on insertion of unused texts: %s' % e)
+
+    def filter_used(self, text_ids):
+        """
+        Check a lot of text IDs in one query, by joining a temporary table with table <used>.\n
+        :param text_ids: sequence of text_id
+        :return: set of text IDs which are used.
+        """
+        try:
+            cur = self._con.cursor()
+            cur.execute('CREATE TEMP TABLE IF NOT EXISTS query_ids (tid TEXT PRIMARY KEY)')
+            cur.execute('DELETE FROM query_ids')
+            cur.executemany('INSERT OR IGNORE INTO query_ids (tid) VALUES(?)', [(i,) for i in text_ids])
+            sql = '''SELECT q.tid FROM query_ids q JOIN texts t ON t.tid = q.tid
+                WHERE EXISTS (SELECT 1 FROM used u WHERE u.tid_id = t.id)'''
+            cur.execute(sql)
+            records = set(t[0] for t in cur.fetchall())
+            cur.execute('DELETE FROM query_ids')
+            self._con.commit()
+            return records
+        except Exception as e:
+            self._con.rollback()
+            print('Error on querying used texts: %s' % e)
+            return set()
+
+    def record_run(self, game_root_dir, revision=None):
+        """
+        Save current content of <used> as a new run, stored as delta against the previous run.\n
+        :param game_root_dir: game root which is scanned.
+        :param revision: commit hash (or revision number) of game project.
+        :return: id of the new run. -1 when error occurs.
+        """
+        try:
+            cur = self._con.cursor()
+            cur.execute('INSERT INTO runs (time, game_root, revision) VALUES(?,?,?)',
+                        (datetime.datetime.now().isoformat(sep=' ', timespec='seconds'), game_root_dir, revision))
+            run_id = cur.lastrowid
+            cur.execute('DROP TABLE IF EXISTS temp.run_current')
+            cur.execute('DROP TABLE IF EXISTS temp.run_previous')
+            cur.execute('CREATE TEMP TABLE run_current AS SELECT DISTINCT tid_id, loc_id FROM used')
+            sql = '''CREATE TEMP TABLE run_previous AS SELECT tid_id, loc_id FROM run_deltas
+                WHERE run_id < ? GROUP BY tid_id, loc_id HAVING SUM(op) > 0'''
+            cur.execute(sql, (run_id,))
+            sql = '''INSERT INTO run_deltas (run_id, tid_id, loc_id, op)
+                SELECT ?, tid_id, loc_id, %d FROM (SELECT tid_id, loc_id FROM %s EXCEPT SELECT tid_id, loc_id FROM %s)'''
+            cur.execute(sql % (1, 'run_current', 'run_previous'), (run_id,))
+            cur.execute(sql % (-1, 'run_previous', 'run_current'), (run_id,))
+            cur.execute('UPDATE runs SET usages = (SELECT COUNT(*) FROM run_current) WHERE id=?', (run_id,))
+            cur.execute('DROP TABLE temp.run_current')
+            cur.execute('DROP TABLE temp.run_previous')
+            self._con.commit()
+            return run_id
+        except Exception as e:
+            self._con.rollback()
+            print('Error on recording run: %s' % e)
+            return -1
+
+    def read_runs(self):
+        """
+        :return: list of tuple(id, time, game_root, revision, count of usages), from the oldest to the latest.
+        """
+        try:
+            cur = self._con.cursor()
+            cur.execute('SELECT id, time, game_root, revision, usages FROM runs ORDER BY id')
+            return cur.fetchall()
+        except Exception as e:
+            print('Error on reading runs: %s' % e)
+            return []
+
+    def diff_runs(self, run_a, run_b):
+        """
+        Compare usages of two runs. Only deltas between them are read, full snapshots are never built.\n
+        :param run_a: id of the old run.
+        :param run_b: id of the new run.
+        :return: tuple(added, removed, changed).
+            added: dict {text_id: [locations]} of texts which are used in run_b, but not in run_a.
+            removed: dict {text_id: [locations]} of texts which are used in run_a, but not in run_b (become unused).
+            changed: dict {text_id: tuple([added locations], [removed locations])} of texts used in both runs.
+        """
+        added, removed, changed = {}, {}, {}
+        sign = 1 if run_a <= run_b else -1
+        low, high = min(run_a, run_b), max(run_a, run_b)
+        try:
+            cur = self._con.cursor()
+            # 两次之间，每个(文本, 位置)的净变化
+            sql = '''SELECT d.tid_id, t.tid, l.loc, SUM(d.op) AS net FROM run_deltas d
+                JOIN texts t ON t.id = d.tid_id
+                LEFT JOIN locations l ON l.id = d.loc_id
+                WHERE d.run_id > ? AND d.run_id <= ?
+                GROUP BY d.tid_id, d.loc_id HAVING net != 0'''
+            cur.execute(sql, (low, high))
+            deltas = {}  # {tid_id: (text_id, [added locations], [removed locations])}
+            for tid_id, tid, loc, net in cur.fetchall():
+                entry = deltas.setdefault(tid_id, (tid, [], []))
+                (entry[1] if net * sign > 0 else entry[2]).append(loc)
+            # 只对有变化的文本，统计它在旧的那次扫描里的使用次数
+            cur.execute('DROP TABLE IF EXISTS temp.diff_ids')
+            cur.execute('CREATE TEMP TABLE diff_ids (tid_id INTEGER PRIMARY KEY)')
+            cur.executemany('INSERT INTO diff_ids (tid_id) VALUES(?)', [(i,) for i in deltas.keys()])
+            sql = '''SELECT d.tid_id, SUM(d.op) FROM run_deltas d JOIN diff_ids i ON i.tid_id = d.tid_id
+                WHERE d.run_id <= ? GROUP BY d.tid_id'''
+            cur.execute(sql, (run_a,))
+            counts_a = dict(cur.fetchall())
+            cur.execute('DROP TABLE temp.diff_ids')
+            for tid_id, (tid, locs_added, locs_removed) in deltas.items():
+                count_a = counts_a.get(tid_id, 0)
+                if count_a == 0:
+                    added[tid] = locs_added
+                elif count_a + len(locs_added) - len(locs_removed) == 0:
+                    removed[tid] = locs_removed
+                else:
+                    changed[tid] = (locs_added, locs_removed)
+        except Exception as e:
+            print('Error on comparing runs: %s' % e)
+        return added, removed, changed
+
+    def record_metrics(self, run_id, stages):
+        """
+        :param run_id: id of run which stages belong to. See record_run().
+        :param stages: sequence of dict {'stage': name, 'wall': seconds, ...}, such as StageMetrics.as_dict().
+            Keys are TextDataBase.METRIC_COLUMNS. Missing ones are saved as NULL.
+        """
+        try:
+            columns = TextDataBase.METRIC_COLUMNS
+            sql = 'INSERT INTO metrics (run_id, stage, %s) VALUES(?,?%s)' % (', '.join(columns), ',?' * len(columns))
+            rows = [(run_id, each['stage']) + tuple(json.dumps(v) if isinstance(v, dict) else v
+                                                    for v in (each.get(i) for i in columns)) for each in stages]
+            self._con.executemany(sql, rows)
+            self._con.commit()
+        except Exception as e:
+            print('Error on recording metrics: %s' % e)
+
+    def read_metrics(self, run_id):
+        """
+        :return: list of dict {'stage': name, 'wall': seconds, ...} of the run, in the order they're recorded.
+        """
+        try:
+            columns = ('stage',) + TextDataBase.METRIC_COLUMNS
+            cur = self._con.cursor()
+            cur.execute('SELECT %s FROM metrics WHERE run_id=? ORDER BY id' % ', '.join(columns), (run_id,))
+            stages = [dict(zip(columns, row)) for row in cur.fetchall()]
+            for each in stages:
+                each['encodings'] = json.loads(each['encodings']) if each['encodings'] else {}
+            return stages
+        except Exception as e:
+            print('Error on reading metrics: %s' % e)
+            return []
+
+    def commit(self):
+        self._con.commit()
+
+    def close(self):
+        self._con.close()
+        self._filename = None
+
+    @staticmethod
+    def clear_database(filename):
+        try:
+            con = sqlite3.connect(filename)
+            TextDataBase.migrate(con)
+            cur = con.cursor()
+            # texts、locations的整数键被历次扫描的快照引用，不能清除
+            for table in ['unused', 'used', 'sources', 'manifest']:
+                cur.execute('DELETE FROM %s' % table)
+            con.commit()
+        except Exception as e:
+            print('Error on clear of DB: %s' % e)
+
+    @staticmethod
+    def create_new(filename: str):
+        """
+        Make sure there's no such a file with the specified name.\n
+        :param filename: database file name.
+        :return: TextDataBase obj.
+        """
+        try:
+            sql = '''CREATE TABLE used (
+                id    INTEGER PRIMARY KEY UNIQUE NOT NULL,
+                tid   TEXT NOT NULL,
+                loc   text,
+                src   TEXT);
+                CREATE TABLE unused (
+                id    INTEGER PRIMARY KEY UNIQUE NOT NULL,
+                tid   TEXT);'''
+            con = sqlite3.connect(filename)
+            con.executescript(sql)
+            con.commit()
+            TextDataBase.migrate(con)
+            return TextDataBase(filename, con)
+        except Exception as e:
+            print('Error on creation of DB: %s' % e)
+            return None
+
+    @staticmethod
+    def open_old(filename):
+        try:
+            if not TextDataBase.validate(filename):  # wrong database (different structure)
+                return None
+            con = sqlite3.connect(filename)
+            TextDataBase.migrate(con)
+            return TextDataBase(filename, con)
+        except Exception as e:
+            print('Error on opening DB: %s' % e)
+            return None
+
+    @staticmethod
+    def tune(con):
+        pragmas = [
+            'PRAGMA journal_mode=WAL',  # 读写互不阻塞，提交也更快
+            'PRAGMA synchronous=NORMAL',  # WAL模式下，这已足够安全
+            'PRAGMA temp_store=MEMORY',
+            'PRAGMA cache_size=-65536'  # 64MB
+        ]
+        for sql in pragmas:
+            con.execute(sql)
+
+    @staticmethod
+    def migrate_to_v1(con):
+        """
+        Column used.src (which file the usage is found in), and table manifest (fingerprints of every scanned file).
+        They're used to find changed files for incremental scan.
+        """
+        cur = con.cursor()
+        cur.execute('PRAGMA table_info (used)')
+        if all(col[1] != 'src' for col in cur.fetchall()):
+            cur.execute('ALTER TABLE used ADD COLUMN src TEXT')
+        sql = '''CREATE TABLE IF NOT EXISTS manifest (
+            path  TEXT PRIMARY KEY NOT NULL,
+            size  INTEGER,
+            mtime REAL,
+            hash  TEXT);'''
+        cur.execute(sql)
+
+    @staticmethod
+    def migrate_to_v2(con):
+        """
+        Indexes for lookup by text ID and by source file.
+        """
+        cur = con.cursor()
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_used_tid ON used (tid)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_used_src ON used (src)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_unused_tid ON unused (tid)')
+
+    @staticmethod
+    def migrate_to_v3(con):
+        """
+        Text IDs, locations and source files are stored only once in their own tables.
+        Table <used> holds only their integer keys.
+        """
+        sql = '''CREATE TABLE texts (
+            id    INTEGER PRIMARY KEY NOT NULL,
+            tid   TEXT UNIQUE NOT NULL);
+            CREATE TABLE locations (
+            id    INTEGER PRIMARY KEY NOT NULL,
+            loc   TEXT UNIQUE NOT NULL);
+            CREATE TABLE sources (
+            id    INTEGER PRIMARY KEY NOT NULL,
+            src   TEXT UNIQUE NOT NULL);
+            CREATE TABLE used_v3 (
+            id      INTEGER PRIMARY KEY UNIQUE NOT NULL,
+            tid_id  INTEGER NOT NULL,
+            loc_id  INTEGER,
+            src_id  INTEGER);
+            INSERT INTO texts (tid) SELECT DISTINCT tid FROM used;
+            INSERT INTO locations (loc) SELECT DISTINCT loc FROM used WHERE loc IS NOT NULL;
+            INSERT INTO sources (src) SELECT DISTINCT src FROM used WHERE src IS NOT NULL;
+            INSERT INTO used_v3 (id, tid_id, loc_id, src_id)
+                SELECT u.id, t.id, l.id, s.id FROM used u
+                JOIN texts t ON t.tid = u.tid
+                LEFT JOIN locations l ON l.loc = u.loc
+                LEFT JOIN sources s ON s.src = u.src;
+            DROP TABLE used;
+            ALTER TABLE used_v3 RENAME TO used;
+            CREATE INDEX idx_used_tid ON used (tid_id);
+            CREATE INDEX idx_used_src ON used (src_id);'''
+        con.executescript(sql)
+
+    @staticmethod
+    def migrate_to_v4(con):
+        """
+        Every scan is recorded as a run. Its snapshot of <used> is saved as delta against the previous run:
+        op=1 for each added (text, location), op=-1 for each removed one.
+        """
+        sql = '''CREATE TABLE runs (
+            id        INTEGER PRIMARY KEY NOT NULL,
+            time      TEXT NOT NULL,
+            game_root TEXT,
+            revision  TEXT,
+            usages    INTEGER);
+            CREATE TABLE run_deltas (
+            run_id  INTEGER NOT NULL,
+            tid_id  INTEGER NOT NULL,
+            loc_id  INTEGER,
+            op      INTEGER NOT NULL);
+            CREATE INDEX idx_run_deltas_run ON run_deltas (run_id);
+            CREATE INDEX idx_run_deltas_tid ON run_deltas (tid_id);'''
+        con.executescript(sql)
+
+    @staticmethod
+    def migrate_to_v5(con):
+        """
+        Metrics of each stage of a run (and of later analysis on it): time, memory and counters.
+        """
+        sql = '''CREATE TABLE metrics (
+            id          INTEGER PRIMARY KEY NOT NULL,
+            run_id      INTEGER NOT NULL,
+            stage       TEXT NOT NULL,
+            wall        REAL,
+            cpu         REAL,
+            peak_memory INTEGER,
+            files       INTEGER,
+            bytes       INTEGER,
+            cells       INTEGER,
+            matches     INTEGER,
+            errors      INTEGER);
+            CREATE INDEX idx_metrics_run ON metrics (run_id);'''
+        con.executescript(sql)
+
+    @staticmethod
+    def migrate_to_v6(con):
+        """
+        Each usage (text, location, source) is recorded only once. Scan results are streamed into <used> in batches,
+        so duplicates are dropped here by the unique index, instead of by a set of all usages in memory.
+        """
+        sql = '''DELETE FROM used WHERE id NOT IN (SELECT MIN(id) FROM used GROUP BY tid_id, loc_id, src_id);
+            CREATE UNIQUE INDEX idx_used_unique ON used (tid_id, loc_id, src_id);'''
+        con.executescript(sql)
+
+    @staticmethod
+    def migrate_to_v7(con):
+        """
+        Count of text IDs dropped by ignore rules, in metrics of each stage.
+        """
+        con.execute('ALTER TABLE metrics ADD COLUMN ignored INTEGER')
+
+    @staticmethod
+    def migrate_to_v8(con):
+        """
+        Counters of encoding detection in metrics of each stage: cache hits, fallbacks to whole-file detection,
+        and files and time per encoding (JSON).
+        """
+        con.executescript('''ALTER TABLE metrics ADD COLUMN encoding_hits INTEGER;
+            ALTER TABLE metrics ADD COLUMN encoding_fallbacks INTEGER;
+            ALTER TABLE metrics ADD COLUMN encodings TEXT;''')
+
+    @staticmethod
+    def register(cur, rows):
+        """
+        Make sure all text IDs, locations and source files have their keys, before rows are inserted into <used>.\n
+        :param cur: sqlite cursor obj
+        :param rows: sequence of tuple(text_id, location, source)
+        """
+        text_ids, locations, sources = set(), set(), set()
+        for tid, loc, src in rows:
+            text_ids.add(tid)
+            locations.add(loc)
+            sources.add(src)
+        locations.discard(None)
+        sources.discard(None)
+        cur.executemany('INSERT OR IGNORE INTO texts (tid) VALUES(?)', [(i,) for i in text_ids])
+        cur.executemany('INSERT OR IGNORE INTO locations (loc) VALUES(?)', [(i,) for i in locations])
+        cur.executemany('INSERT OR IGNORE INTO sources (src) VALUES(?)', [(i,) for i in sources])
+
+    @staticmethod
+    def migrate(con):
+        """
+        Upgrade database created by old version, step by step, to current schema version.
+        """
+        migrations = {
+            1: TextDataBase.migrate_to_v1,
+            2: TextDataBase.migrate_to_v2,
+            3: TextDataBase.migrate_to_v3,
+            4: TextDataBase.migrate_to_v4,
+            5: TextDataBase.migrate_to_v5,
+            6: TextDataBase.migrate_to_v6,
+            7: TextDataBase.migrate_to_v7,
+            8: TextDataBase.migrate_to_v8
+        }
+        version = con.execute('PRAGMA user_version').fetchone()[0]
+        for target in range(version + 1, TextDataBase.SCHEMA_VERSION + 1):
+            migrations[target](con)
+            con.execute('PRAGMA user_version = %d' % target)
+            con.commit()
+
+    @staticmethod
+    def is_col_name_same(cursor, table, columns):
+        """
+        check if column names are correct as expected.\n
+        :param cursor: sqlite cursor obj
+        :param table: table name
+        :param columns: column names
+        :return: True if all column names are correct
+        """
+        cursor.execute('PRAGMA table_info (%s)' % table)
+        structs = cursor.fetchall()
+        result = (structs[i][1] == columns[i] for i in range(len(columns)))
+        return all(result)
+
+    @staticmethod
+    def validate(filename):
+        """
+        Check if specified file has expected table structure.\n
+        :param filename: database file.
+        :return: True if its structure is correct.
+        """
+        with sqlite3.connect(filename) as con:
+            cur = con.cursor()
+            version = cur.execute('PRAGMA user_version').fetchone()[0]
+            tables = {
+                'used': ['id', 'tid', 'loc'] if version < 3 else ['id', 'tid_id', 'loc_id'],
+                'unused': ['id', 'tid']
+            }
+            correct = all(TextDataBase.is_col_name_same(cur, tbl, cols) for tbl, cols in tables.items())
+        return correct
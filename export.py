@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Export rows of LOC.xlsx to several workbooks (used, unused, ...), according to partition rules.
+pandas is imported on first export, so the list of formats can be read without it.
+"""
+import os
+import re
+
+
+def select_unused(sheet, frame, unused):
+    """
+    :param sheet: sheet name.
+    :param frame: DataFrame of sheet.
+    :param unused: set of unused IDs in sheet (without sheet prefix).
+    :return: boolean mask of rows.
+    """
+    return frame['ID'].isin(unused)
+
+
+def select_all(sheet, frame, unused):
+    import pandas as pd
+    return pd.Series(True, index=frame.index)
+
+
+def select_untranslated(column, pattern):
+    """
+    :param column: language column, such as 'ar'
+    :param pattern: regex of characters of the language.
+    :return: rule to select rows without any such character (all in English, or blank).
+    """
+    regex = re.compile(pattern)
+
+    def select(sheet, frame, unused):
+        return ~frame[column].map(lambda cell: isinstance(cell, str) and regex.search(cell) is not None)
+    return select
+
+
+class ExcelSheetWriter:
+    """
+    Whole workbook is built in memory by pandas, and saved on close.
+    """
+    def __init__(self, output):
+        import pandas as pd
+        self._output = output
+        self._writer = pd.ExcelWriter(output)
+
+    @property
+    def path(self):
+        """
+        :return: path of the file or folder written.
+        """
+        return self._output
+
+    def write(self, sheet, frame, mask):
+        frame[mask].to_excel(self._writer, sheet_name=sheet, index=False)
+
+    def close(self):
+        self._writer.close()
+
+
+class StreamingExcelWriter:
+    """
+    Write-only workbook of openpyxl. Rows are serialized to a temporary file as soon as they're appended,
+    so memory usage doesn't grow with the size of workbook.
+    """
+    def __init__(self, output):
+        import openpyxl
+        self._output = output
+        self._book = openpyxl.Workbook(write_only=True)
+
+    @property
+    def path(self):
+        return self._output
+
+    def write(self, sheet, frame, mask):
+        worksheet = self._book.create_sheet(title=sheet)
+        import pandas as pd
+        worksheet.append([str(i) for i in frame.columns])
+        for keep, row in zip(mask.to_numpy(), frame.itertuples(index=False, name=None)):
+            if keep:
+                worksheet.append([None if pd.isna(cell) else cell for cell in row])
+
+    def close(self):
+        self._book.save(self._output)
+
+
+class CsvWriter:
+    """
+    One CSV file per sheet, in a folder named after the output (used.xlsx -> used/LC_COMMON.csv).
+    """
+    EXT = '.csv'
+
+    def __init__(self, output):
+        self._folder = os.path.splitext(output)[0]
+        os.makedirs(self._folder, exist_ok=True)
+
+    @property
+    def path(self):
+        return self._folder
+
+    def write(self, sheet, frame, mask):
+        frame[mask].to_csv(os.path.join(self._folder, sheet + self.EXT), index=False, encoding='utf-8-sig')
+
+    def close(self):
+        pass
+
+
+class ParquetWriter(CsvWriter):
+    """
+    One Parquet file per sheet. It requires pyarrow (or fastparquet).
+    """
+    EXT = '.parquet'
+
+    def write(self, sheet, frame, mask):
+        part = frame[mask]
+        # 同一列里可能混合了数字和文字，Parquet要求每列类型一致
+        texts = {col: 'string' for col in part.columns if part[col].dtype == object}
+        part.astype(texts).to_parquet(os.path.join(self._folder, sheet + self.EXT), index=False)
+
+
+EXPORT_FORMATS = {
+    'xlsx': ExcelSheetWriter,
+    'xlsx-streaming': StreamingExcelWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter
+}
+
+
+class ExportEngine:
+    """
+    Each row of a sheet goes to the output of the first rule which selects it.
+    Sheets are partitioned and written one by one, so only one sheet of each output is held at a time
+    (except 'xlsx' format, whose workbooks are saved on close).
+    Coding Example:
+        engine = ExportEngine([('unused.xlsx', select_unused), ('used.xlsx', select_all)])
+        outputs = engine.export(frame_dict, unused_dict, fmt='csv')
+    Output:
+        ['unused', 'used']
+    """
+    def __init__(self, rules):
+        """
+        :param rules: list of tuple(output file name, select function as select(sheet, frame, unused))
+        """
+        self._rules = rules
+
+    def split(self, sheet, frame, unused_dict):
+        """
+        :param sheet: sheet name.
+        :param frame: DataFrame of sheet.
+        :param unused_dict: dict {sheet: set of unused IDs}
+        :return: list of tuple(output, boolean mask of rows). None if sheet can't be partitioned.
+        """
+        import pandas as pd
+        try:
+            unused = unused_dict[sheet]
+            remaining = pd.Series(True, index=frame.index)
+            masks = []
+            for output, select in self._rules:
+                mask = remaining & select(sheet, frame, unused)
+                masks.append((output, mask))
+                remaining &= ~mask
+            return masks
+        except Exception as e:
+            print(e)
+            return None
+
+    def export(self, frame_dict, unused_dict, fmt='xlsx'):
+        """
+        :param frame_dict: dict {sheet: DataFrame}
+        :param unused_dict: dict {sheet: set of unused IDs}
+        :param fmt: key of EXPORT_FORMATS.
+        :return: list of paths really written, in the order of rules. For 'csv' and 'parquet' formats, they're folders.
+        """
+        writer_class = EXPORT_FORMATS[fmt]
+        writers = {}
+        try:
+            for output, _ in self._rules:
+                writers[output] = writer_class(output)
+            for sheet, frame in frame_dict.items():
+                masks = self.split(sheet, frame, unused_dict)
+                if masks is None:
+                    continue
+                for output, mask in masks:
+                    writers[output].write(sheet, frame, mask)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return [writers[output].path for output, _ in self._rules]
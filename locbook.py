@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+LOC.xlsx: the workbook of all multi-language texts. Each sheet is a section, whose name is the prefix of text IDs.
+"""
+import os
+
+
+def read_all_sheets(filename):
+    import pandas as pd
+    # read all sheets at once [to a dictionary {sheet : data_frame}]
+    return pd.read_excel(filename, sheet_name=None)
+
+
+class LocBook:
+    """
+    LOC.xlsx is the biggest workbook of game. It's parsed only once per session, unless it's changed on disk.
+    With a FileCache, parsed sheets are also kept for later sessions.
+    Coding Example:
+        book = LocBook(os.path.join(game_root, 'Assets', 'Text', 'LOC.xlsx'), cache)
+        all_strings = book.text_ids()
+        for sheet, frame in book.frames().items():
+            pass
+    """
+    def __init__(self, filename, cache=None):
+        """
+        :param filename: LOC.xlsx
+        :param cache: FileCache of parsed sheets. None: no persistent cache.
+        """
+        self._filename = filename
+        self._cache = cache
+        self._frames = None
+        self._text_ids = None
+        self._stamp = None  # 解析时文件的(size, mtime)
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def frames(self):
+        """
+        :return: dict {sheet: DataFrame}. Don't modify them, they're shared by all callers.
+        """
+        stat = os.stat(self._filename)
+        stamp = (stat.st_size, stat.st_mtime)
+        if self._frames is None or self._stamp != stamp:
+            if self._cache is None:
+                self._frames = read_all_sheets(self._filename)
+            else:
+                self._frames = self._cache.load(self._filename, read_all_sheets)
+            self._text_ids = None
+            self._stamp = stamp
+        return self._frames
+
+    @property
+    def sheets(self):
+        return list(self.frames().keys())
+
+    def text_ids(self):
+        """
+        :return: set of all text IDs, as '{sheet}_{ID}'
+        """
+        frame_dict = self.frames()
+        if self._text_ids is not None:
+            return self._text_ids
+        text_ids = set()
+        for sheet, frame in frame_dict.items():
+            try:
+                for cell in frame['ID']:  # 暂时只考虑ID这一列。在精简了文本以后，可以全读出来做深入分析
+                    text_id = '{0}_{1}'.format(sheet, cell)
+                    text_ids.add(text_id.strip())
+            except Exception as e:
+                print(e)
+        self._text_ids = text_ids
+        return text_ids
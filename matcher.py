@@ -0,0 +1,485 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Data structures to match many text IDs at once.
+"""
+import collections
+import fnmatch
+import hashlib
+import re
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher. It's built once for all patterns, then each text is scanned only once.
+    Coding Example:
+        automaton = AhoCorasick(['LC_COMMON_ok', 'LC_UI_title'])
+        found = automaton.search('var s = "LC_UI_title";')
+    Output:
+        {'LC_UI_title'}
+    """
+    def __init__(self, patterns):
+        self._goto = [{}]    # 状态转移
+        self._fail = [0]     # 失配时回退到的状态
+        self._output = [()]  # 到达该状态时，匹配成功的所有模式
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def add(self, pattern):
+        if len(pattern) == 0:
+            return
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = (pattern,)
+
+    def build(self):
+        """
+        Compute failure links with breadth-first search. Outputs of failure states are merged in.
+        """
+        queue = collections.deque(self._goto[0].values())
+        while len(queue) > 0:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail > 0 and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = fail
+                if len(self._output[fail]) > 0:
+                    self._output[next_state] = self._output[next_state] + self._output[fail]
+
+    def __len__(self):
+        return len(self._goto)
+
+    def search(self, text):
+        """
+        :return: set of all patterns which occur in text.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for ch in text:
+            while state > 0 and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if len(output[state]) > 0:
+                found.update(output[state])
+        return found
+
+
+class SubstringIndex:
+    """
+    N-gram inverted index over a collection of strings, to find all strings containing a given substring.
+    Candidates are the intersection of posting lists of all n-grams in the substring, then verified by str.find().
+    So results are the same as checking every string, but only a few strings are checked.
+    Coding Example:
+        index = SubstringIndex(['LC_COMMON_ok', 'LC_UI_title'], n=3)
+        found = index.find('UI_ti')
+    Output:
+        {'LC_UI_title'}
+    """
+    def __init__(self, strings, n=3):
+        self._n = n
+        self._strings = list(set(strings))
+        self._postings = {}  # {n-gram: set of positions in self._strings}
+        for i, full in enumerate(self._strings):
+            for j in range(len(full) - n + 1):
+                gram = full[j:j + n]
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = {i}
+                else:
+                    posting.add(i)
+
+    def __len__(self):
+        return len(self._strings)
+
+    def find(self, sub):
+        """
+        :return: set of all strings which contain sub.
+        """
+        n = self._n
+        if len(sub) < n:  # 太短了，没有n-gram可用
+            return set(full for full in self._strings if full.find(sub) > -1)
+        postings = []
+        for gram in set(sub[j:j + n] for j in range(len(sub) - n + 1)):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = candidates & posting
+            if len(candidates) == 0:
+                return set()
+        return set(self._strings[i] for i in candidates if self._strings[i].find(sub) > -1)
+
+
+class TemplateMatcher:
+    """
+    Match C# interpolated strings (such as $"LC_COMMON_{agentName}") against all text IDs in one sweep.
+    Each template becomes a regex like 'LC_COMMON_([a-zA-Z0-9_]+)'. Its literal prefix is put into a character trie,
+    so each text ID walks the trie once, and only templates whose prefix matches are verified by their regex.
+    Coding Example:
+        templates = TemplateMatcher(['LC_COMMON_{agentName}', 'LC_UI_{0}_tips'], casefold=True)
+        exact, folded = templates.match_all_cases(['LC_COMMON_bob', 'LC_UI_Shop_Tips', 'LC_UI_shop'])
+    Output:
+        {'LC_COMMON_{agentName}': {'LC_COMMON_bob'}}
+        {'LC_COMMON_{agentName}': {'LC_COMMON_bob'}, 'LC_UI_{0}_tips': {'LC_UI_Shop_Tips'}}
+    """
+    REGEX_CSHARP = re.compile(r'(\w+)({.+})(\w*)')
+    TERMINAL = ''  # 字典树节点里，以此为键保存在该节点结束的模板
+
+    def __init__(self, text_ids, casefold=False):
+        """
+        :param text_ids: text IDs. Only those like C# interpolated strings are used as templates.
+        :param casefold: match in lower case, to find spelling mistakes.
+        """
+        self._casefold = casefold
+        self._trie = {}
+        self._count = 0
+        for each in text_ids:
+            if not TemplateMatcher.is_template(each):
+                continue
+            text = each.lower() if casefold else each
+            regex = re.compile(TemplateMatcher.REGEX_CSHARP.sub(r'\1([a-zA-Z0-9_]+)\3', text))
+            regex_exact = re.compile(TemplateMatcher.REGEX_CSHARP.sub(r'\1([a-zA-Z0-9_]+)\3', each))
+            result = TemplateMatcher.REGEX_CSHARP.match(text)
+            prefix = '' if result is None else result.group(1)  # 正则式以这段字面文字开头
+            node = self._trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node.setdefault(TemplateMatcher.TERMINAL, []).append((each, regex, regex_exact))
+            self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def is_template(text_id):
+        return TemplateMatcher.REGEX_CSHARP.match(text_id) is not None
+
+    def candidates(self, text):
+        """
+        :return: list of tuple(template, regex, case-sensitive regex), whose literal prefix is a prefix of text.
+        """
+        found = []
+        node = self._trie
+        for ch in text:
+            found.extend(node.get(TemplateMatcher.TERMINAL, []))
+            node = node.get(ch)
+            if node is None:
+                return found
+        found.extend(node.get(TemplateMatcher.TERMINAL, []))
+        return found
+
+    def match_all_cases(self, strings):
+        """
+        Match with and without case in the same sweep. Matcher must be created with casefold=True.
+        :param strings: text IDs to be matched.
+        :return: tuple(dict of exact matches, dict of matches ignoring case).
+            Both are dict {template: set of matched text IDs}. Templates without any match are not included.
+        """
+        exact, folded = {}, {}
+        if self._count == 0:
+            return exact, folded
+        for full in strings:
+            text = full.lower()
+            for template, regex, regex_exact in self.candidates(text):
+                if regex.match(text):
+                    folded.setdefault(template, set()).add(full)
+                if regex_exact.match(full):
+                    exact.setdefault(template, set()).add(full)
+        return exact, folded
+
+
+class CaseInsensitiveIndex:
+    """
+    Substring index over lower-case text IDs, which remembers their original forms.
+    One query returns both exact matches and matches which differ only in case (possible spelling mistakes).
+    Coding Example:
+        index = CaseInsensitiveIndex(['LC_UI_Title', 'LC_UI_title_2'])
+        exact, folded = index.find('UI_title')
+    Output:
+        {'LC_UI_title_2'}, {'LC_UI_Title'}
+    """
+    def __init__(self, strings, n=3):
+        self._originals = {}  # {lower-case text ID: set of original text IDs}
+        for full in strings:
+            self._originals.setdefault(full.lower(), set()).add(full)
+        self._index = SubstringIndex(self._originals.keys(), n)
+
+    def __len__(self):
+        return sum(len(i) for i in self._originals.values())
+
+    def find(self, sub):
+        """
+        :return: tuple(set of strings containing sub, set of strings containing sub only if case is ignored)
+        """
+        exact, folded = set(), set()
+        for lower in self._index.find(sub.lower()):
+            for full in self._originals[lower]:
+                if full.find(sub) > -1:
+                    exact.add(full)
+                else:
+                    folded.add(full)
+        return exact, folded
+
+
+class SectionResolver:
+    """
+    Character trie of sheet names of LOC.xlsx (each with separator '_'), to find the section of a text ID.
+    Cost of a query is O(length of text ID), instead of checking every sheet name.
+    If several sheet names are prefixes of a text ID (such as LC and LC_UI), the first sheet of LOC.xlsx wins.
+    Coding Example:
+        resolver = SectionResolver(['LC_COMMON', 'LC_UI'])
+        section, tid = resolver.resolve('LC_UI_title')
+    Output:
+        LC_UI title
+    """
+    SEPARATOR = '_'
+
+    def __init__(self, sections):
+        self._sections = list(sections)
+        self._names = set(self._sections)
+        self._trie = {}
+        for order, section in enumerate(self._sections):
+            node = self._trie
+            for ch in section + SectionResolver.SEPARATOR:
+                node = node.setdefault(ch, {})
+            node.setdefault(TemplateMatcher.TERMINAL, (order, section))  # 重名的分页，以第一个为准
+
+    @staticmethod
+    def of(sections):
+        """
+        :param sections: SectionResolver obj, or sheet names.
+        """
+        return sections if isinstance(sections, SectionResolver) else SectionResolver(sections)
+
+    @property
+    def sections(self):
+        return self._sections
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __bool__(self):
+        return len(self._sections) > 0
+
+    def section_of(self, text_id):
+        """
+        :return: sheet name whose prefix (with '_') the text ID starts with. None if no sheet matches.
+        """
+        found = None
+        node = self._trie
+        for ch in text_id:
+            node = node.get(ch)
+            if node is None:
+                break
+            terminal = node.get(TemplateMatcher.TERMINAL)
+            if terminal is not None and (found is None or terminal[0] < found[0]):
+                found = terminal
+        return None if found is None else found[1]
+
+    def resolve(self, text_id):
+        """
+        :return: tuple(sheet name, ID in sheet). None if no sheet matches.
+        """
+        section = self.section_of(text_id)
+        if section is None:
+            return None
+        return section, text_id[len(section) + 1:]
+
+    def is_section_only(self, name):
+        """
+        :return: True if name is a sheet name, maybe with one more character (such as 'LC_UI_'), but no real ID.
+        """
+        return name in self._names or name[:-1] in self._names
+
+
+class IgnoreMatcher:
+    """
+    Ignore rules of one scope, compiled into one matcher: exact IDs in a hash set, prefixes in a character trie,
+    and all globs and regexes in one combined regex. Each text ID costs at most these three lookups.
+    Regexes which can't be joined with others (with groups or inline global flags) are matched one by one.
+    Coding Example:
+        ignored = IgnoreMatcher(['Activity_main'], ['LC_DEBUG_'], ['LC_TMP_[0-9]+'])
+        print(ignored('LC_DEBUG_fps'), ignored('LC_TMP_12'), ignored('LC_UI_ok'))
+    Output:
+        True True False
+    """
+    def __init__(self, exact=(), prefixes=(), patterns=(), separate=()):
+        """
+        :param exact: text IDs.
+        :param prefixes: prefixes of text IDs.
+        :param patterns: regexes, joined into one. Each must match the whole text ID.
+        :param separate: regexes compiled one by one, such as those with backreferences. See IgnoreRules.is_joinable().
+        """
+        self._exact = frozenset(exact)
+        self._trie = {}
+        for prefix in prefixes:
+            node = self._trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node[TemplateMatcher.TERMINAL] = True
+        patterns = list(patterns)
+        self._regex = re.compile('|'.join('(?:%s)' % i for i in patterns)) if len(patterns) > 0 else None
+        self._separate = [re.compile(i) for i in separate]
+
+    def __call__(self, text_id):
+        """
+        :return: True if text ID is ignored by any rule.
+        """
+        if text_id in self._exact:
+            return True
+        node = self._trie
+        for ch in text_id:
+            if TemplateMatcher.TERMINAL in node:
+                return True
+            node = node.get(ch)
+            if node is None:
+                break
+        else:
+            if TemplateMatcher.TERMINAL in node:
+                return True
+        if self._regex is not None and self._regex.fullmatch(text_id) is not None:
+            return True
+        return any(i.fullmatch(text_id) is not None for i in self._separate)
+
+
+class IgnoreRules:
+    """
+    Rules of strings which are not text IDs (such as non_text_id.txt), one rule per line:
+        Activity_main                 exact text ID
+        LC_DEBUG_*                    prefix (a glob whose only wildcard is the last '*')
+        LC_*_test?                    glob
+        re:LC_TMP_[0-9]+              regex, which must match the whole text ID
+        [solution] LC_TEST_*          only in these scanners: asset, game data, solution, activity list
+        [asset, path=*/Editor/*] *    only in files whose full name matches the glob (for the external C# tool:
+                                      location printed by it, such as Foo.cs(12))
+        # comment
+    Rules of the same scope are compiled together, and a matcher for each combination of scopes is built only once.
+    Scanners get the matcher of a file once, then check each text ID when it's found.
+    Coding Example:
+        rules = IgnoreRules(['Activity_main', 'LC_DEBUG_*', '[solution] re:LC_TMP_[0-9]+'])
+        ignored = rules.matcher('solution', '/data/Assets/Scripts/Debug.cs')
+        print(ignored('LC_DEBUG_fps'), ignored('LC_TMP_12'), ignored('LC_UI_ok'))
+    Output:
+        True True False
+    """
+    SCANNERS = ('asset', 'game data', 'solution', 'activity list')
+    REGEX_SCOPE = re.compile(r'\[([^\]]*)\]\s*(.*)$')
+    WILDCARDS = re.compile(r'[*?\[]')
+
+    def __init__(self, lines=()):
+        """
+        :param lines: rules. Wrong ones are skipped (with a message).
+        """
+        self._lines = []
+        groups = {}  # {(scanners, path globs): tuple(exact, prefixes, patterns, separate)}
+        for line in lines:
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            try:
+                scope, rule = IgnoreRules.parse_scope(line)
+                exact, prefixes, patterns, separate = groups.setdefault(scope, (set(), [], [], []))
+                if rule.startswith('re:'):
+                    re.compile(rule[3:])  # 先单独检查，以免一条错误的规则让合并后的正则式失效
+                    (patterns if IgnoreRules.is_joinable(rule[3:]) else separate).append(rule[3:])
+                elif IgnoreRules.WILDCARDS.search(rule) is None:
+                    exact.add(rule)
+                elif rule.endswith('*') and IgnoreRules.WILDCARDS.search(rule, 0, len(rule) - 1) is None:
+                    prefixes.append(rule[:-1])
+                else:
+                    patterns.append(fnmatch.translate(rule))
+            except (ValueError, re.error) as e:
+                print('Error in ignore rule: %s (%s)' % (line, e))
+                continue
+            self._lines.append(line)
+        self._groups = [(scanners, paths, rules) for (scanners, paths), rules in groups.items()]
+        self._matchers = {}  # {tuple of indexes of groups: IgnoreMatcher}
+
+    @staticmethod
+    def parse_scope(line):
+        """
+        :return: tuple(tuple(scanners, path globs), rule). Scanners is None for all scanners.
+        """
+        result = IgnoreRules.REGEX_SCOPE.match(line)
+        if result is None:
+            return (None, ()), line
+        scanners, paths = set(), set()
+        for item in result.group(1).split(','):
+            item = item.strip()
+            if item.startswith('path='):
+                paths.add(item[len('path='):])
+            elif item in IgnoreRules.SCANNERS:
+                scanners.add(item)
+            elif len(item) > 0:
+                raise ValueError('unknown scope: %s' % item)
+        if len(result.group(2).strip()) == 0:
+            raise ValueError('no rule')
+        return (frozenset(scanners) if len(scanners) > 0 else None, tuple(sorted(paths))), result.group(2).strip()
+
+    @staticmethod
+    def is_joinable(pattern):
+        """
+        :param pattern: a valid regex.
+        :return: True if it can be joined with other regexes: without groups (their names and numbers would clash,
+            and backreferences would point to groups of other rules) or inline global flags such as (?i).
+        """
+        try:
+            return re.compile('(?:%s)|' % pattern).groups == 0
+        except re.error:
+            return False
+
+    @staticmethod
+    def of(rules):
+        """
+        :param rules: IgnoreRules obj, lines of rules, or None (no rule).
+        """
+        if isinstance(rules, IgnoreRules):
+            return rules
+        return IgnoreRules(() if rules is None else rules)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def digest(self):
+        """
+        :return: hash of all valid rules, to find out if they're changed since last scan.
+        """
+        return hashlib.md5('\n'.join(self._lines).encode('utf-8')).hexdigest()
+
+    def matcher(self, scanner, path=''):
+        """
+        :param scanner: one of IgnoreRules.SCANNERS
+        :param path: full file name being scanned, for rules scoped by path.
+        :return: IgnoreMatcher of all rules which apply. None if there isn't any.
+        """
+        key = tuple(i for i, (scanners, paths, _) in enumerate(self._groups)
+                    if (scanners is None or scanner in scanners)
+                    and (len(paths) == 0 or any(fnmatch.fnmatch(path, i) for i in paths)))
+        if len(key) == 0:
+            return None
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            exact, prefixes, patterns, separate = set(), [], [], []
+            for i in key:
+                exact |= self._groups[i][2][0]
+                prefixes.extend(self._groups[i][2][1])
+                patterns.extend(self._groups[i][2][2])
+                separate.extend(self._groups[i][2][3])
+            matcher = self._matchers[key] = IgnoreMatcher(exact, prefixes, patterns, separate)
+        return matcher
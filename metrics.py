@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Metrics of each stage (and sub-pass) of scan and analysis: wall time, CPU time, peak memory and counters.
+They're saved with the scan run in database (see TextDataBase.record_metrics), and can be exported as JSON.
+"""
+import cProfile
+import collections
+import contextlib
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+
+class StageMetrics:
+    """
+    Coding Example:
+        metrics = StageMetrics('asset')
+        metrics.count('files', 12)
+        metrics.merge(engine)  # counters and CPU time of worker processes of a ScanEngine
+    """
+    COUNTERS = ('files', 'bytes', 'cells', 'matches', 'errors', 'ignored', 'encoding_hits', 'encoding_fallbacks')  # cells：检查过的单元（Excel单元格、C#字符串常量、文本ID）
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0  # 秒
+        self.cpu = 0.0  # 秒，当前线程的，加上工作进程的
+        self.peak_memory = None  # 字节，Python分配的内存峰值（需要trace_memory）
+        self.counters = collections.Counter()
+
+    def count(self, key, n=1):
+        """
+        :param key: one of StageMetrics.COUNTERS, or tuple(encoding, 'files' or 'seconds') of decoded text files.
+        """
+        self.counters[key] += n
+
+    @property
+    def encodings(self):
+        """
+        :return: dict {encoding: {'files': count of decoded files, 'seconds': time of detecting and decoding}}
+        """
+        result = {}
+        for key, value in self.counters.items():
+            if isinstance(key, tuple):
+                result.setdefault(key[0], {'files': 0, 'seconds': 0.0})[key[1]] += value
+        return result
+
+    def merge(self, engine):
+        """
+        :param engine: ScanEngine obj which has run in this stage.
+        """
+        self.counters.update(engine.counters)
+        self.cpu += engine.worker_cpu
+
+    def as_dict(self):
+        result = {'stage': self.name, 'wall': self.wall, 'cpu': self.cpu, 'peak_memory': self.peak_memory}
+        for key in StageMetrics.COUNTERS:
+            result[key] = self.counters[key]
+        result['encodings'] = self.encodings
+        return result
+
+
+class MetricsRecorder:
+    """
+    Record metrics of stages. Stages can be nested (sub-passes), or run at the same time in different threads.
+    CPU time is counted per thread, so concurrent stages don't count each other.
+    Peak memory is traced by tracemalloc (slow, so it's optional). It's process-wide: concurrent stages share it,
+    and memory of worker processes isn't included.
+    Coding Example:
+        recorder = MetricsRecorder(trace_memory=True, profile_stages=['asset'], profile_dir='profiles')
+        with recorder.stage('asset') as metrics:
+            metrics.count('files', len(prefabs))
+        print([i.as_dict() for i in recorder.flush()])
+    """
+    def __init__(self, trace_memory=False, profile_stages=(), profile_dir='profiles'):
+        """
+        :param trace_memory: trace peak memory of each stage.
+        :param profile_stages: names of stages to be profiled by cProfile. '*' for all stages.
+        :param profile_dir: profiles are written here, as <stage>.prof (read by pstats or snakeviz).
+        """
+        self._trace_memory = trace_memory
+        self._profile_stages = set(profile_stages)
+        self._profile_dir = profile_dir
+        self._stages = []  # 按完成的顺序
+        self._open = []  # 正在运行的阶段，内存峰值要传给它们
+        self._lock = threading.Lock()
+
+    @property
+    def stages(self):
+        """
+        :return: list of StageMetrics, in the order they finished, since last flush.
+        """
+        return self._stages
+
+    def flush(self):
+        """
+        :return: list of StageMetrics recorded since last flush. They're removed from recorder.
+        """
+        with self._lock:
+            stages, self._stages = self._stages, []
+        return stages
+
+    def _update_peak(self):
+        # 全局的峰值只有一个：每次重置之前，先把它记到所有正在运行的阶段上
+        peak = tracemalloc.get_traced_memory()[1]
+        for each in self._open:
+            each.peak_memory = max(each.peak_memory or 0, peak)
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+
+    def _profiled(self, name):
+        return name in self._profile_stages or '*' in self._profile_stages
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        :param name: name of stage. Sub-passes are named after their stage, such as 'analyze: pass 1'.
+        :return: context manager, which gives StageMetrics obj of this stage.
+        """
+        metrics = StageMetrics(name)
+        if self._trace_memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                self._update_peak()
+                self._open.append(metrics)
+        profiler = None
+        if self._profiled(name):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:  # 别的阶段正在分析（Python 3.12+同时只能有一个）
+                print('Error on profiling stage %s: %s' % (name, e))
+                profiler = None
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield metrics
+        finally:
+            metrics.wall = time.perf_counter() - start
+            metrics.cpu += time.thread_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self._profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self._profile_dir, re.sub(r'\W+', '_', name) + '.prof'))
+            with self._lock:
+                if self._trace_memory:
+                    self._update_peak()
+                    self._open.remove(metrics)
+                self._stages.append(metrics)
@@ -0,0 +1,655 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+File-level scanners.
+They're module-level functions (not methods of TextAnalyzer), so they can be sent to worker processes.
+pandas is imported only by the functions which parse workbooks.
+"""
+import codecs
+import mmap
+import os
+import re
+import collections
+import concurrent.futures
+import contextlib
+import multiprocessing
+import queue
+import threading
+import time
+from cslexer import iter_string_literals
+from matcher import AhoCorasick, SectionResolver
+
+
+UTF_BOMS = [  # 长的在前：UTF-32 LE的BOM以UTF-16 LE的BOM开头
+    ('utf-8-sig', codecs.BOM_UTF8),
+    ('utf-32', codecs.BOM_UTF32_LE),
+    ('utf-32', codecs.BOM_UTF32_BE),
+    ('utf-16', codecs.BOM_UTF16_LE),
+    ('utf-16', codecs.BOM_UTF16_BE)
+]
+TEXT_ENCODINGS = ['utf-8', 'utf-16', 'utf-32', 'gb2312', 'big5', 'big5hkscs', 'gbk', 'gb18030', 'ansi']
+SAMPLE_SIZE = 64 << 10  # 只用文件开头的这么多字节判断编码
+
+_encodings = {}  # 每个进程记住判断过的编码：{full file name: (size, mtime, encoding)}
+_encodings_loaded = {}  # 每个进程读入过的EncodingCache：{file name: mtime}，文件更新后重新读入
+
+
+_counters = threading.local()  # 每个线程（工作进程里是主线程）各自的计数，由_run_chunk()收集
+
+
+def count(key, n=1):
+    """
+    Add to counter of current scan chunk (see ScanEngine.counters). Nothing happens outside ScanEngine.
+    :param key: one of metrics.StageMetrics.COUNTERS, or tuple(encoding, 'files' or 'seconds') by try_read_text_file().
+    """
+    counters = getattr(_counters, 'current', None)
+    if counters is not None:
+        counters[key] += n
+
+
+def _load_encodings(cache):
+    """
+    :param cache: cache.EncodingCache obj. It's read again only if main process has saved it since last time.
+    """
+    try:
+        mtime = os.path.getmtime(cache.filename)
+    except OSError:
+        return
+    if _encodings_loaded.get(cache.filename) != mtime:
+        _encodings_loaded[cache.filename] = mtime
+        _encodings.update(cache.load())
+
+
+def _decodes(sample, encoding, final):
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final)  # 不是final时，末尾被截断的字符不算错
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def detect_encoding(sample, final=True):
+    """
+    Decide encoding from a prefix of file: BOM, then pattern of zero bytes (UTF-16/32 of mostly ASCII text),
+    then trial decoding of the prefix only.
+    :param sample: bytes at the beginning of file.
+    :param final: True if sample is the whole file.
+    :return: name of encoding. None if no encoding fits.
+    """
+    for enc, bom in UTF_BOMS:
+        if sample.startswith(bom):
+            return enc
+    if b'\x00' in sample:
+        # ASCII字符在UTF-32里占4字节（3个0），在UTF-16里占2字节（1个0）
+        for enc, zeros in [('utf-32-le', (1, 2, 3)), ('utf-32-be', (0, 1, 2)), ('utf-16-le', (1,)), ('utf-16-be', (0,))]:
+            width = 4 if enc.startswith('utf-32') else 2
+            columns = [sample[i::width] for i in zeros]
+            if all(column.count(0) * 2 > len(column) for column in columns) and _decodes(sample, enc, final):
+                return enc
+        skipped = []
+    else:  # 没有0字节，不会是UTF-16/32（否则几乎任何偶数长度的字节都能“解码”成UTF-16）
+        skipped = ['utf-16', 'utf-32']
+    for enc in TEXT_ENCODINGS:
+        if enc not in skipped and _decodes(sample, enc, final):
+            return enc
+    return None
+
+
+def try_read_text_file(filename):
+    """
+    :return: content of text file. None if it can't be decoded by any of TEXT_ENCODINGS.
+    """
+    start = time.perf_counter()
+    with open(filename, 'rb') as ifs:
+        stat = os.fstat(ifs.fileno())
+        raw = ifs.read()
+    stamp = (stat.st_size, stat.st_mtime)
+    cached = _encodings.get(filename)
+    if cached is not None and cached[:2] == stamp:
+        count('encoding_hits')  # 编码已知，不必再判断
+        enc = cached[2]
+    else:
+        enc = detect_encoding(raw[:SAMPLE_SIZE], len(raw) <= SAMPLE_SIZE)
+    content = None
+    if enc is not None:
+        try:
+            content = raw.decode(encoding=enc)
+        except UnicodeDecodeError:
+            pass
+    if content is None:  # 样本里看不出来（比如非法字节在样本之后），只能用整个文件判断
+        count('encoding_fallbacks')
+        enc = detect_encoding(raw)
+        if enc is not None:
+            content = raw.decode(encoding=enc)
+    if enc is not None:
+        if cached != stamp + (enc,):
+            _encodings[filename] = stamp + (enc,)
+            learned = getattr(_counters, 'learned', None)
+            if learned is not None:  # 交给主进程保存，下次扫描时所有进程都能用上
+                learned[filename] = stamp + (enc,)
+        count((enc, 'files'))
+        count((enc, 'seconds'), time.perf_counter() - start)
+    return content
+
+
+class SeparatorTokenizer:
+    """
+    中间的间隔符可以有多个。str的内置split只支持一个间隔符。
+    Cells can be split one by one, or all cells of a workbook in one batch with pandas.
+    Coding Example:
+        target = "abc;| def;     ghi |;"
+        tokenizer = SeparatorTokenizer('|;, ')
+        strings = tokenizer.split(target)
+    Output:
+        abc
+        def
+        ghi
+    """
+    def __init__(self, separators):
+        # 第一段之后，只取到换行符为止（和以前逐段截取的 '(.*)' 一致）
+        self._head = re.compile('([^%s]+)([^\n]*)' % (separators,))
+        self._token = re.compile('[^%s]+' % (separators,))
+
+    def split(self, target):
+        result = self._head.search(target)
+        if result is None:
+            return []
+        return [result.group(1)] + self._token.findall(result.group(2))
+
+    def split_all(self, cells):
+        """
+        :param cells: pandas.Series of str
+        :return: pandas.Series of all pieces of all cells.
+        """
+        import pandas as pd
+        parts = cells.str.extract(self._head.pattern)
+        heads = parts[0].dropna()
+        rests = parts[1].dropna().str.findall(self._token.pattern).explode().dropna()
+        return pd.concat([heads, rests], ignore_index=True)
+
+
+# Unity的YAML资源文件是UTF-8的。逐字节匹配，文本ID可能含有非ASCII字符，解码后再按\w截取
+_LOC_KEY = re.compile(rb'stringLocKey:[ \t\f\v]+((?:\w|[\x80-\xff])+)')
+_WORD = re.compile(r'\w+')
+
+
+def scan_prefab_file(full_file_name, sections, ignore=None):
+    """
+    Scan all text IDs in one Unity asset file (prefab, scene, ScriptableObject).
+    File is memory-mapped, and searched by one bytes regex without decoding or splitting lines.
+    Only matched text IDs are decoded.
+    :param full_file_name: .prefab, .unity or .asset file.
+    :param sections: SectionResolver obj, or sheet names of LOC.xlsx
+    :param ignore: IgnoreRules obj. Ignored text IDs are dropped as soon as they're found.
+    :return: set of tuple(text_id, location)
+    """
+    sections = SectionResolver.of(sections)
+    ignored = None if ignore is None else ignore.matcher('asset', full_file_name)
+    strings = set()
+    file = os.path.basename(full_file_name)
+    count('files')
+    with open(full_file_name, 'rb') as ifs:
+        size = os.fstat(ifs.fileno()).st_size
+        count('bytes', size)
+        if size == 0:  # 空文件不能映射
+            return strings
+        with mmap.mmap(ifs.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            found = set(result.group(1) for result in _LOC_KEY.finditer(buffer))
+    for raw in found:
+        result = _WORD.match(raw.decode('utf-8', errors='replace'))
+        if result is None:
+            continue
+        text_id = result.group()
+        if ignored is not None and ignored(text_id):
+            count('ignored')
+        elif sections.is_section_only(text_id):
+            print('Error text ID: %s in %s' % (text_id, full_file_name))
+            count('errors')
+        else:
+            strings.add((text_id, file))
+    count('cells', len(found))
+    count('matches', len(strings))
+    return strings
+
+
+def read_string_cells(full_file_name):
+    """
+    :param full_file_name: Excel workbook.
+    :return: list of all different strings in cells of all sheets.
+    """
+    import pandas as pd
+    # read all sheets at once [to a dictionary {sheet : data_frame}]
+    frame_dict = pd.read_excel(full_file_name, sheet_name=None)
+    cells = []
+    for sheet, frame in frame_dict.items():
+        frame = frame.select_dtypes(exclude=['number', 'bool', 'datetime', 'datetimetz', 'timedelta'])
+        if frame.shape[1] == 0:
+            continue
+        cells.append(pd.Series(frame.to_numpy().ravel()))  # 所有可能是文字的列，首尾相接成一列
+    if len(cells) == 0:
+        return []
+    cells = pd.concat(cells, ignore_index=True)
+    cells = cells[cells.map(lambda cell: isinstance(cell, str))].drop_duplicates()
+    return cells.tolist()
+
+
+_DATA_ID_TAIL = re.compile(r'(\w+|{.+})*')  # 分页前缀之后，文本ID的其余部分
+
+
+def scan_game_data_file(workbook, sections, cache=None, ignore=None):
+    """
+    Scan all text IDs in one data workbook.
+    :param workbook: tuple(data folder, full file name)
+    :param sections: SectionResolver obj, or sheet names of LOC.xlsx
+    :param cache: FileCache of string cells. Workbook is parsed only if its cache is out of date.
+    :param ignore: IgnoreRules obj. Ignored text IDs are dropped as soon as they're found.
+    :return: set of tuple(text_id, location)
+    """
+    import pandas as pd
+    each_dir, full_file_name = workbook
+    sections = SectionResolver.of(sections)
+    ignored = None if ignore is None else ignore.matcher('game data', full_file_name)
+    strings = set()
+    tokenizer = SeparatorTokenizer('|;, ')  # 现暂时只发现了两种间隔符：;（分号）,（逗号）
+    location = '%s - %s' % (each_dir, os.path.basename(full_file_name))
+    count('files')
+    count('bytes', os.path.getsize(full_file_name))
+    if cache is None:
+        cells = read_string_cells(full_file_name)
+    else:
+        cells = cache.load(full_file_name, read_string_cells)
+    count('cells', len(cells))
+    if len(cells) == 0:
+        return strings
+    pieces = tokenizer.split_all(pd.Series(cells, dtype=object)).drop_duplicates()  # cell可以容纳多条文本，以分号间隔开。
+    for piece in pieces:
+        section = sections.section_of(piece)
+        if section is None:
+            continue
+        text_id = piece[:_DATA_ID_TAIL.match(piece, len(section) + 1).end()]
+        if ignored is not None and ignored(text_id):
+            count('ignored')
+        elif sections.is_section_only(text_id):
+            print('Error text ID: %s in <%s>' % (text_id, location))
+            count('errors')
+        else:
+            strings.add((text_id, location))
+    count('matches', len(strings))
+    return strings
+
+
+def read_csharp_literals(full_file_name):
+    """
+    :param full_file_name: C# source file.
+    :return: list of tuple(line number, value) of all string literals. Empty if file encoding is unknown.
+    """
+    content = try_read_text_file(full_file_name)
+    if content is None:
+        print('Unknown encoding: ' + full_file_name)
+        count('errors')
+        return []
+    return list(iter_string_literals(content))
+
+
+_CSHARP_ID_TAIL = re.compile(r'(?:[^\s{}]|{[^{}]*})*$')  # 文本ID里没有空白（插值的表达式除外），有空白的是普通文字
+
+
+def scan_csharp_file(full_file_name, sections, cache=None, ignore=None):
+    """
+    Scan all text IDs in string literals of one C# source file, as FindTextRef.exe does for the whole solution.
+    :param full_file_name: C# source file.
+    :param sections: SectionResolver obj, or sheet names of LOC.xlsx
+    :param cache: FileCache of string literals. Source is lexed only if its cache is out of date.
+    :param ignore: IgnoreRules obj. Ignored text IDs are dropped as soon as they're found.
+    :return: set of tuple(text_id, location)
+    """
+    sections = SectionResolver.of(sections)
+    ignored = None if ignore is None else ignore.matcher('solution', full_file_name)
+    strings = set()
+    if len(sections) == 0:
+        return strings
+    count('files')
+    count('bytes', os.path.getsize(full_file_name))
+    if cache is None:
+        literals = read_csharp_literals(full_file_name)
+    else:
+        literals = cache.load(full_file_name, read_csharp_literals)
+    file = os.path.basename(full_file_name)
+    count('cells', len(literals))
+    for line, text_id in literals:
+        section = sections.section_of(text_id)
+        if section is None or _CSHARP_ID_TAIL.match(text_id, len(section) + 1) is None:
+            continue
+        if ignored is not None and ignored(text_id):
+            count('ignored')
+        elif sections.is_section_only(text_id):
+            print('Error text ID: %s in %s(%d)' % (text_id, full_file_name, line))
+            count('errors')
+        else:
+            strings.add((text_id, '%s(%d)' % (file, line)))
+    count('matches', len(strings))
+    return strings
+
+
+_automaton = {}  # 每个进程只保留最近一次创建的匹配器：{tuple of text IDs: AhoCorasick}
+
+
+def search_source_file(full_file_name, text_ids):
+    """
+    Search text IDs in one C# source file.
+    :param full_file_name: source file.
+    :param text_ids: tuple of text IDs. The matcher built for them is reused by later calls in the same process.
+    :return: sorted list of text IDs found in file. None if file encoding is unknown.
+    """
+    automaton = _automaton.get(text_ids)
+    if automaton is None:
+        _automaton.clear()
+        automaton = _automaton[text_ids] = AhoCorasick(text_ids)
+    content = try_read_text_file(full_file_name)
+    count('files')
+    if content is None:
+        count('errors')
+        return None
+    count('bytes', len(content))
+    found = sorted(automaton.search(content))
+    count('matches', len(found))
+    return found
+
+
+class TreeWalker:
+    """
+    Visit a directory tree only once (with os.scandir), and route each file to all scanners registered for its extension.
+    Coding Example:
+        prefabs = []
+        walker = TreeWalker(game_root, ['Library', 'Temp', 'Assets/Plugins/Docs', '*/.git'])
+        walker.register(['.prefab'], lambda entry: prefabs.append(entry.path))
+        walker.walk()
+        print(walker.counts['.prefab'])
+    """
+    def __init__(self, root, excluded=()):
+        """
+        :param root: root directory.
+        :param excluded: directories which are skipped with all their descendants. Each is a path relative to root
+            (such as 'Library', or 'Assets/Temp'), or '*/' and a name (such as '*/.git') for that name at any depth.
+        """
+        self._root = root
+        self._excluded = set()  # 相对于root的路径，以/分隔
+        self._excluded_names = set()  # 任何深度都跳过的文件夹名
+        for each in excluded:
+            each = each.replace('\\', '/').strip('/')
+            if each.startswith('*/'):
+                self._excluded_names.add(each[2:])
+            else:
+                self._excluded.add(each)
+        self._routes = {}
+        self._counts = collections.Counter()
+
+    def register(self, extensions, callback):
+        """
+        :param extensions: file extensions, such as '.cs'
+        :param callback: function as callback(entry), entry is os.DirEntry of a matched file.
+        """
+        for ext in extensions:
+            self._routes.setdefault(ext, []).append(callback)
+
+    @property
+    def counts(self):
+        """
+        :return: collections.Counter {extension: count of files}, of all files visited by last walk.
+        """
+        return self._counts
+
+    def walk(self):
+        self._counts.clear()
+        folders = [(self._root, '')]  # (full path, path relative to root)
+        while len(folders) > 0:
+            folder, relative = folders.pop()
+            try:
+                it = os.scandir(folder)
+            except OSError as e:
+                print('Error on visiting folder: %s' % e)
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        path = entry.name if len(relative) == 0 else relative + '/' + entry.name
+                        if path not in self._excluded and entry.name not in self._excluded_names:
+                            folders.append((entry.path, path))
+                        continue
+                    _, ext = os.path.splitext(entry.name)
+                    self._counts[ext] += 1
+                    for callback in self._routes.get(ext, []):
+                        callback(entry)
+
+
+def _run_chunk(func, chunk, args, encodings=None):
+    """
+    :param encodings: cache.EncodingCache obj, of encodings known before this scan. None if there's no cache.
+    :return: tuple(list of results, counters of chunk, encodings detected in chunk, CPU time of chunk)
+    """
+    start = time.thread_time()
+    if encodings is not None:
+        _load_encodings(encodings)
+    _counters.current = counters = collections.Counter()
+    _counters.learned = learned = {}
+    try:
+        results = [func(task, *args) for task in chunk]
+    finally:
+        _counters.current = None
+        _counters.learned = None
+    return results, counters, learned, time.thread_time() - start
+
+
+class ScanEngine:
+    """
+    Run a file-level scanner over many files with a process pool.
+    Files are sent to workers in chunks, to reduce the cost of inter-process communication.
+    Results are collected in the order of files, so they are the same as the serial way.
+    Counters of scanners (see count()) are summed up from all workers, for metrics of the stage.
+    Engines of concurrent stages should share one pool (see create_pool()), instead of a pool per stage.
+    Encodings of text files detected by workers are saved to EncodingCache (if any) after each call of imap(),
+    and known to all workers of later scans.
+    Coding Example:
+        engine = ScanEngine(workers=8, chunk_size=16)
+        strings = engine.union(scan_prefab_file, prefabs, sections)
+        print(engine.counters['files'], engine.worker_cpu)
+        #
+        with ScanEngine.create_pool(8) as pool:
+            assets = ScanEngine(8, pool=pool).imap(scan_prefab_file, prefabs, sections)
+            sources = ScanEngine(8, pool=pool).imap(scan_csharp_file, files, sections)
+    """
+    def __init__(self, workers=0, chunk_size=16, pool=None, encodings=None):
+        """
+        :param workers: count of worker processes. 0: one per CPU core; 1: run in current process.
+        :param chunk_size: count of files sent to a worker at once.
+        :param pool: shared ProcessPoolExecutor (see create_pool()), owned by caller. A new pool per call if None.
+        :param encodings: cache.EncodingCache obj. Encodings aren't kept between scans if None.
+        """
+        self._workers = ScanEngine.worker_count(workers)
+        self._chunk_size = max(chunk_size, 1)
+        self._pool = pool
+        self._encodings = encodings
+        self._learned = {}  # 本次imap()中新判断出的编码
+        self._counters = collections.Counter()
+        self._worker_cpu = 0.0
+
+    @staticmethod
+    def worker_count(workers):
+        """
+        :param workers: 0 for one per CPU core.
+        """
+        return workers if workers > 0 else (os.cpu_count() or 1)
+
+    @staticmethod
+    def create_pool(workers=0):
+        """
+        Worker processes are started by forkserver (or spawn where it's not available, such as Windows), never by fork:
+        pools are often created in threads of StageScheduler, and a forked child may copy locks held by other threads.
+        So the main script must be importable, and start scans under `if __name__ == "__main__":`.
+        :param workers: count of worker processes. 0: one per CPU core.
+        :return: ProcessPoolExecutor. Its workers are started on demand.
+        """
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        return concurrent.futures.ProcessPoolExecutor(max_workers=ScanEngine.worker_count(workers), mp_context=context)
+
+    @property
+    def counters(self):
+        """
+        :return: collections.Counter {key: count}, of all calls of map() on this engine.
+        """
+        return self._counters
+
+    @property
+    def worker_cpu(self):
+        """
+        :return: CPU time (in seconds) of worker processes. Files scanned in current process aren't included.
+        """
+        return self._worker_cpu
+
+    def map(self, func, tasks, *args):
+        """
+        :param func: module-level function as func(task, *args)
+        :param tasks: sequence of tasks, such as file names.
+        :param args: other arguments passed to each call of func.
+        :return: list of results, in the same order as tasks.
+        """
+        return list(self.imap(func, tasks, *args))
+
+    def imap(self, func, tasks, *args):
+        """
+        Like map(), but results are yielded one by one as soon as they're ready (still in the order of tasks).
+        At most two chunks per worker are pending, so results of a big project are never all in memory.
+        :return: generator of results.
+        """
+        tasks = list(tasks)
+        chunks = (tasks[i:i + self._chunk_size] for i in range(0, len(tasks), self._chunk_size))
+        self._learned = {}
+        if self._workers == 1 or len(tasks) <= self._chunk_size:
+            for chunk in chunks:
+                results, counters, learned, _ = _run_chunk(func, chunk, args, self._encodings)  # CPU时间已经算在当前线程里
+                self._counters.update(counters)
+                self._learned.update(learned)
+                yield from results
+        else:
+            pending = collections.deque()
+            with contextlib.ExitStack() as stack:
+                pool = self._pool
+                if pool is None:
+                    pool = stack.enter_context(ScanEngine.create_pool(self._workers))
+                for chunk in chunks:
+                    pending.append(pool.submit(_run_chunk, func, chunk, args, self._encodings))
+                    if len(pending) >= self._workers * 2:
+                        yield from self._collect(pending.popleft())
+                while len(pending) > 0:
+                    yield from self._collect(pending.popleft())
+        if self._encodings is not None:
+            self._encodings.update(self._learned)
+
+    def _collect(self, future):
+        results, counters, learned, seconds = future.result()
+        self._counters.update(counters)
+        self._learned.update(learned)
+        self._worker_cpu += seconds
+        return results
+
+    def union(self, func, tasks, *args):
+        """
+        :return: union of all result sets.
+        """
+        strings = set()
+        for result in self.map(func, tasks, *args):
+            strings |= result
+        return strings
+
+
+_FINISHED = object()  # 阶段结束的标记
+
+
+class StageScheduler:
+    """
+    Run independent scan stages at the same time, each in its own thread.
+    A stage waiting on an external process (such as the C# finder) or on a process pool doesn't block the others,
+    so total time is close to the longest stage, instead of the sum of all stages.
+    Stages are generators, and their items are consumed in current thread while they're produced.
+    Coding Example:
+        scheduler = StageScheduler()
+        scheduler.add('solution', iter_solution)
+        scheduler.add('prefab', engine.imap, scan_prefab_file, prefabs, sections)
+        for name, strings in scheduler.stream():
+            print(name, len(strings))
+        print(scheduler.timings)
+    """
+    def __init__(self):
+        self._stages = []
+        self._timings = {}
+
+    def add(self, name, func, *args):
+        """
+        :param name: stage name, unique in scheduler.
+        :param func: generator function as func(*args)
+        """
+        self._stages.append((name, func, args))
+
+    @property
+    def timings(self):
+        """
+        :return: dict {stage name: wall time in seconds}, of last stream(). Stages are in the order they finished.
+        """
+        return self._timings
+
+    def stream(self, max_pending=256):
+        """
+        Items of all stages are passed to current thread through a bounded queue.
+        A stage waits when max_pending items aren't consumed yet, so memory stays flat however many items there are.
+        :param max_pending: max count of items produced but not consumed.
+        :return: generator of tuple(stage name, item). If any stage fails, its exception is raised after all stages finish.
+        """
+        self._timings = {}
+        if len(self._stages) == 0:
+            return
+        items = queue.Queue(max_pending)
+        stopped = threading.Event()  # 消费者提前退出时，各阶段不再等待
+
+        def put(entry):
+            while not stopped.is_set():
+                try:
+                    items.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(name, func, args):
+            start = time.perf_counter()
+            try:
+                for item in func(*args):
+                    if not put((name, item, None)):
+                        return
+            except Exception as e:
+                put((name, _FINISHED, e))
+                return
+            put((name, _FINISHED, time.perf_counter() - start))
+
+        error = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self._stages)) as pool:
+            for name, func, args in self._stages:
+                pool.submit(produce, name, func, args)
+            remaining = len(self._stages)
+            try:
+                while remaining > 0:
+                    name, item, finished = items.get()
+                    if item is not _FINISHED:
+                        yield name, item
+                        continue
+                    remaining -= 1
+                    if isinstance(finished, Exception):
+                        print('Error on stage %s: %s' % (name, finished))
+                        error = error or finished
+                        continue
+                    self._timings[name] = finished
+                    print('Stage %s: %.3f s' % (name, finished))
+            finally:
+                stopped.set()
+        if error is not None:
+            raise error